@@ -0,0 +1,293 @@
+"""
+Benchmarks for the scheduling, storage and email pipelines.
+
+Times Scheduler.generate_schedules (with and without npsg), csv_parser, email
+rendering and dispatch against an in-memory transport across roster sizes, and
+Database load/save/retrieve/delete across store sizes. Results are written as
+json so runs of different releases can be compared with --compare.
+
+usage: python benchmarks/pipeline.py [--rosters 10,1000] [--stores 10,1000]
+                                     [--output results.json] [--compare old.json]
+"""
+
+from typing import Callable, Dict, List, Optional
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from models import (  # noqa: E402
+    Body,
+    Database,
+    EmailSender,
+    EmailStudents,
+    MemoryTransport,
+    Scheduler,
+)
+from util import csv_parser  # noqa: E402
+
+ROSTER_SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+EMAIL_SIZES = [10, 100, 1000, 10000, 100000]
+STORE_SIZES = [10, 100, 1000, 10000, 100000]
+
+
+def timeit(
+    func: Callable[[], object],
+    repeat: int,
+    setup: Optional[Callable[[], object]] = None,
+) -> Dict[str, float]:
+    """
+    :param setup: (Optional) run untimed before every repeat
+    """
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {"min_s": min(samples), "median_s": statistics.median(samples)}
+
+
+def roster(size: int) -> List[Dict[str, str]]:
+    return [
+        {"Name": f"Student {i}", "Email": f"student{i}@example.com"}
+        for i in range(size)
+    ]
+
+
+def schedule_record(students: List[str], record_id: int, npsg: Optional[str] = "3"):
+    schedule = Scheduler("12:00:00", "15:00:00", "1:00:00", students, npsg)
+    return {
+        "schedule": schedule.generate_schedules(),
+        "course": f"MCT{record_id % 50}",
+        "session": str(2000 + record_id % 25),
+        "semester": "first" if record_id % 2 else "second",
+        "day": "Monday",
+        "subject": "LAB SCHEDULE",
+        "start_time": "12:00:00",
+        "end_time": "15:00:00",
+        "tps": "1:00:00",
+        "npsg": npsg,
+        "id": str(record_id),
+    }
+
+
+def bench_scheduler(sizes: List[int], repeat: int) -> List[Dict]:
+    results = []
+    for size in sizes:
+        students = [f"Student {i}" for i in range(size)]
+        for npsg in (None, "3"):
+            timing = timeit(
+                lambda: Scheduler(
+                    "08:00:00", "18:00:00", "1:00:00", list(students), npsg
+                ).generate_schedules(),
+                repeat,
+            )
+            results.append(
+                {
+                    "name": "scheduler.generate_schedules",
+                    "size": size,
+                    "params": {"npsg": npsg},
+                    **timing,
+                }
+            )
+    return results
+
+
+def bench_csv_parser(sizes: List[int], repeat: int, workdir: str) -> List[Dict]:
+    results = []
+    for size in sizes:
+        file = os.path.join(workdir, f"roster-{size}.csv")
+        with open(file, "w", newline="") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=["Name", "Email"])
+            writer.writeheader()
+            writer.writerows(roster(size))
+        timing = timeit(lambda: csv_parser(file), repeat)
+        results.append(
+            {"name": "util.csv_parser", "size": size, "params": {}, **timing}
+        )
+    return results
+
+
+def bench_email(sizes: List[int], repeat: int) -> List[Dict]:
+    results = []
+    for size in sizes:
+        rows = roster(size)
+        students = [row["Name"] for row in rows]
+        names_email = {row["Name"]: row["Email"] for row in rows}
+        data = schedule_record(students, 1)
+
+        def render():
+            body = Body(data)
+            for sh in data["schedule"]:
+                for group_no, names in sh["groups"].items():
+                    for name in names:
+                        body(
+                            name=name,
+                            group_number=group_no,
+                            start_time=sh["start_time"],
+                            end_time=sh["end_time"],
+                            session_number=sh["session_number"],
+                        )
+
+        def dispatch():
+            sender = EmailSender(
+                "bench@example.com", "", transport=MemoryTransport(), verbose=False
+            )
+            EmailStudents(names_email, data, sender).send_email()
+
+        for name, func in (("email.render", render), ("email.dispatch", dispatch)):
+            results.append(
+                {"name": name, "size": size, "params": {}, **timeit(func, repeat)}
+            )
+    return results
+
+
+def write_store(file: str, size: int):
+    students = [f"Student {i}" for i in range(30)]
+    with open(file, "w") as fd:
+        json.dump([schedule_record(list(students), i) for i in range(size)], fd)
+
+
+def bench_database(sizes: List[int], repeat: int, workdir: str) -> List[Dict]:
+    results = []
+    extra = schedule_record([f"Student {i}" for i in range(30)], -1)
+    for size in sizes:
+        os.environ["DB_NAME"] = os.path.join(workdir, f"db-{size}.json")
+        write_store(os.environ["DB_NAME"], size)
+        db = Database()
+        deleted = dict(extra, id=str(size // 2))
+
+        def save():
+            record = dict(extra, id=f"bench-{time.perf_counter_ns()}")
+            db.save(record)
+
+        def reseed():
+            # every repeat deletes a record, not just the first
+            if not db.retrieve("id", deleted["id"]):
+                db.save(dict(deleted))
+
+        operations = {
+            "database.load": (Database, None),
+            "database.save": (save, None),
+            "database.retrieve": (lambda: db.retrieve("course", "MCT7"), None),
+            "database.delete": (lambda: db.delete("id", deleted["id"]), reseed),
+        }
+        for name, (func, setup) in operations.items():
+            results.append(
+                {
+                    "name": name,
+                    "size": size,
+                    "params": {},
+                    **timeit(func, repeat, setup),
+                }
+            )
+    return results
+
+
+def compare(results: List[Dict], baseline: List[Dict], threshold: float) -> List[str]:
+    """
+    Lists the benchmarks whose min time grew by more than threshold against baseline
+    """
+
+    def key(result):
+        return result["name"], result["size"], json.dumps(result["params"])
+
+    old = {key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        if (previous := old.get(key(result))) is None or not previous["min_s"]:
+            continue
+        ratio = result["min_s"] / previous["min_s"]
+        if ratio > threshold:
+            regressions.append(
+                f"{result['name']} size={result['size']} params={result['params']}: "
+                f"{previous['min_s']:.6f}s -> {result['min_s']:.6f}s ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def sizes_type(value: str) -> List[int]:
+    return [int(size) for size in value.split(",") if size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lab scheduling pipeline benchmarks")
+    parser.add_argument(
+        "--rosters",
+        type=sizes_type,
+        default=ROSTER_SIZES,
+        help="comma separated roster sizes for scheduling and csv parsing",
+    )
+    parser.add_argument(
+        "--emails",
+        type=sizes_type,
+        default=EMAIL_SIZES,
+        help="comma separated roster sizes for email rendering and dispatch",
+    )
+    parser.add_argument(
+        "--stores",
+        type=sizes_type,
+        default=STORE_SIZES,
+        help="comma separated number of schedules in the database",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the json results to this file")
+    parser.add_argument("--compare", help="json results of a previous run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="slowdown ratio against --compare reported as a regression",
+    )
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="lab-bench-")
+    try:
+        # the database and email code print progress we do not want to time
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = [
+                *bench_scheduler(args.rosters, args.repeat),
+                *bench_csv_parser(args.rosters, args.repeat, workdir),
+                *bench_email(args.emails, args.repeat),
+                *bench_database(args.stores, args.repeat, workdir),
+            ]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
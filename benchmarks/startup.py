@@ -0,0 +1,169 @@
+"""
+Cold start benchmark for the command line tool.
+
+Runs `main.py schedule` and `main.py dbaccess` in fresh interpreters with
+`python -X importtime`, reports wall time and total import time as json and
+exits with a non zero status when a budget is exceeded or a module that should
+be lazily imported shows up at startup.
+
+usage: python benchmarks/startup.py [--runs 5] [--budget-ms 100] [--output results.json]
+"""
+
+from typing import Dict, List, Tuple
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+# modules that must only be imported on the code paths that need them
+LAZY_MODULES = [
+    "faker",
+    "smtplib",
+    "ssl",
+    "email.mime.multipart",
+    "cProfile",
+    "tracemalloc",
+    "http.server",
+    "concurrent.futures",
+    "util.generator",
+    "models.ical",
+    "models.versions",
+    "models.shards",
+    "hashlib",
+    "models.transfer",
+    "models.intervals",
+]
+
+COMMANDS = {
+    "schedule": [
+        "schedule",
+        "-f",
+        "stub_data.csv",
+        "-s",
+        "12:00:00",
+        "-e",
+        "15:00:00",
+        "-t",
+        "1:00:00",
+        "-n",
+        "3",
+    ],
+    "dbaccess": ["dbaccess", "-r", "id", "1"],
+}
+
+
+def parse_importtime(stderr: str) -> Tuple[Dict[str, int], int]:
+    """
+    Parses `-X importtime` output.
+    :return: mapping of module name to cumulative time and the total import time (us)
+    """
+    modules = {}
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = int(cumulative)
+        # nested imports are indented and already counted by their parent
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return modules, total
+
+
+def run_once(workdir: str, command: List[str]) -> Dict:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", MAIN, *command],
+        cwd=workdir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{proc.stderr[-2000:]}")
+    modules, total = parse_importtime(proc.stderr)
+    return {
+        "wall_ms": wall * 1000,
+        "import_ms": total / 1000,
+        "lazy_modules_loaded": [m for m in LAZY_MODULES if m in modules],
+    }
+
+
+def prepare_workdir() -> str:
+    workdir = tempfile.mkdtemp(prefix="lab-startup-")
+    shutil.copy(os.path.join(ROOT, "stub_data.csv"), workdir)
+    shutil.copy(os.path.join(ROOT, "db.json"), workdir)
+    with open(os.path.join(workdir, ".env"), "w") as file:
+        file.write("DB_NAME=db.json\nCURRENT_DB_ID=0\n")
+    return workdir
+
+
+def benchmark(runs: int) -> Dict[str, Dict]:
+    workdir = prepare_workdir()
+    results = {}
+    try:
+        for name, command in COMMANDS.items():
+            samples = [run_once(workdir, command) for _ in range(runs)]
+            results[name] = {
+                "runs": runs,
+                "wall_ms_median": statistics.median(s["wall_ms"] for s in samples),
+                "import_ms_median": statistics.median(s["import_ms"] for s in samples),
+                "lazy_modules_loaded": sorted(
+                    {m for s in samples for m in s["lazy_modules_loaded"]}
+                ),
+            }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def check(results: Dict[str, Dict], budget_ms: float) -> List[str]:
+    failures = []
+    for name, result in results.items():
+        if result["lazy_modules_loaded"]:
+            failures.append(
+                f"{name}: eagerly imported {', '.join(result['lazy_modules_loaded'])}"
+            )
+        if result["import_ms_median"] > budget_ms:
+            failures.append(
+                f"{name}: import time {result['import_ms_median']:.1f}ms exceeds {budget_ms}ms"
+            )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLI cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=100.0,
+        help="maximum median total import time of a command",
+    )
+    parser.add_argument("--output", help="write the json results to this file")
+    args = parser.parse_args()
+
+    results = benchmark(args.runs)
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report)
+    print(report)
+
+    failures = check(results, args.budget_ms)
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,71 +6,394 @@ from dotenv import load_dotenv
 from models import (
     InputParser,
     Scheduler,
-    Database,
     EmailStudents,
     SchedulerFormatter,
+    ScheduleStats,
+    database_class,
+    materialized,
+    open_database,
 )
-from util import csv_parser, extract_key_values, lists_to_dictionary
+from util import csv_parser
+from util.metrics import Metrics, count_groups, profile
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from os import path
 import argparse
-from pprint import pprint
+import json
+import os
+import sys
+
+if TYPE_CHECKING:
+    from util.validation import RosterReport
+
+# command line options that only affect how a run is displayed and are not stored
+NON_DATA_ARGS = [
+    "func",
+    "save",
+    "fmt",
+    "output",
+    "slot",
+    "group",
+    "metrics",
+    "profile",
+    "ics",
+    "rejects",
+    "strict",
+]
+
+
+def display(data, args: argparse.Namespace):
+    if args.ics:
+        # commands only pay for the modules of the options they use
+        from models.ical import write_feed
+
+        write_feed(data, args.ics)
+
+    def format_to(out=None):
+        SchedulerFormatter(
+            data, out=out, fmt=args.fmt, session_number=args.slot, group=args.group
+        ).format()
+
+    if args.output:
+        with open(args.output, "w", newline="") as out:
+            format_to(out)
+    else:
+        format_to()
 
 
 def db_data_generator(schedule, args):
     data_template = {"schedule": schedule}
     meta = vars(args)
     for key, value in meta.items():
-        if key not in ["func", "save"]:
+        if key not in NON_DATA_ARGS:
             data_template[key] = value
     return data_template
 
 
-def scheduler_function(args: argparse.Namespace):
-    file_data = csv_parser(args.file)
-    students = extract_key_values(file_data, "Name")
-    emails = extract_key_values(file_data, "Email")
-    names_email = lists_to_dictionary(students, emails)
+def load_roster(file: str, metrics: Metrics) -> "RosterReport":
+    """
+    Reads and validates a roster
+    """
+    from util.validation import validate_roster
+
+    with metrics.span("parse"):
+        file_data = csv_parser(file)
+    metrics.incr("rows_parsed", len(file_data))
+    with metrics.span("validate"):
+        return validate_roster(file_data)
+
+
+def report_rejects(reports: List[Tuple[str, "RosterReport"]], args: argparse.Namespace):
+    """
+    Reports the rejected rows of the rosters (and writes them to --rejects), with
+    --strict the run stops before anything is scheduled or sent
+    :param reports: (roster file, validation report) of every roster used
+    """
+    from util.validation import RosterReport
+
+    rejects = RosterReport()
+    for file, report in reports:
+        if report.rejects:
+            print(
+                f"{file}: {len(report.rejects)} roster rows rejected", file=sys.stderr
+            )
+            rejects.rejects.extend(report.rejects)
+    if not rejects.rejects:
+        return
+    if args.rejects:
+        rejects.write_rejects(args.rejects)
+        print(f"rejected rows written to {args.rejects}", file=sys.stderr)
+    else:
+        for row in rejects.rejects[:10]:
+            print(
+                f"  line {row['line'] or '-'}: {row['reason']} "
+                f"({row['Name'] or '-'}, {row['Email'] or '-'})",
+                file=sys.stderr,
+            )
+    if args.strict:
+        sys.exit("roster has rejected rows, stopping (--strict)")
+
+
+def report_progress(sent: int, total: int):
+    end = "\n" if sent == total else ""
+    print(f"\remails sent: {sent}/{total}", end=end, file=sys.stderr, flush=True)
+
+
+def send_emails(mail: EmailStudents, metrics: Metrics):
+    with metrics.span("email"):
+        try:
+            mail.send_email(progress=report_progress)
+        finally:
+            metrics.incr("emails_sent", mail.sent)
+
+
+def send_in_background(mail: EmailStudents, metrics: Metrics):
+    """
+    Delivers mail on a background thread
+    :return: future whose result() waits for delivery and re-raises any error
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(send_emails, mail, metrics)
+    executor.shutdown(wait=False)
+    return future
+
+
+def scheduler_function(args: argparse.Namespace, metrics: Optional[Metrics] = None):
+    metrics = metrics or Metrics()
+    report = load_roster(args.file, metrics)
+    metrics.incr("rows_rejected", len(report.rejects))
+    report_rejects([(args.file, report)], args)
+    names_email = report.students
+    students = list(names_email)
+
+    with metrics.span("schedule"):
+        full_schedule = Scheduler(
+            args.start_time, args.end_time, args.tps, students, args.npsg
+        ).generate_schedules()
+    metrics.incr("sessions", len(full_schedule))
+    metrics.incr("groups", count_groups(full_schedule))
 
-    full_schedule = Scheduler(
-        args.start_time, args.end_time, args.tps, students, args.npsg
-    ).generate_schedules()
-    db_data = db_data_generator(full_schedule, args)
+    with metrics.span("db_data"):
+        db_data = db_data_generator(full_schedule, args)
     if args.email:
-        mail = EmailStudents(names_email, db_data)
-        mail.send_email()
+        # credentials are asked for up front so delivery can run unattended
+        sender = EmailStudents.prompt_sender(verbose=False)
 
+    # the schedule is persisted before any mail goes out so a failed delivery never loses it
     if args.save:
-        db = Database()
-        db.save(db_data)
+        with metrics.span("save"):
+            db = open_database()
+            db.save(db_data)
+        metrics.incr("bytes_written", db.bytes_written)
+
+    delivery = None
+    if args.email:
+        delivery = send_in_background(
+            EmailStudents(names_email, db_data, sender), metrics
+        )
     # pprint(db_data)
-    SchedulerFormatter([db_data]).format()
+    with metrics.span("display"):
+        display([db_data], args)
+    if delivery is not None:
+        delivery.result()
+
+
+def placement(session_group) -> str:
+    if session_group is None:
+        return "not scheduled"
+    session_number, group = session_group
+    return f"session {session_number}" + (f" {group}" if group else "")
+
 
+def database_function(args: argparse.Namespace, metrics: Optional[Metrics] = None):
+    metrics = metrics or Metrics()
+    with metrics.span("load"):
+        db = open_database()
+    if (args.migrate or args.expire is not False) and not hasattr(db, "expire"):
+        sys.exit("--migrate and --expire need DB_LAYOUT=sharded")
+
+    if args.migrate:
+        with metrics.span("migrate"):
+            moved = db.migrate(args.migrate)
+        print(f"{moved} schedules migrated")
 
-def database_function(args: argparse.Namespace):
-    db = Database()
     if args.retrive:
-        data = db.retrieve(*args.retrive)
+        with metrics.span("retrieve"):
+            data = db.retrieve(*args.retrive)
         # pprint(data)
-        SchedulerFormatter(data)
+        with metrics.span("display"):
+            display(data, args)
         if args.email:
-            file_data = csv_parser(data.get("file"))
-            students = extract_key_values(file_data, "Name")
-            emails = extract_key_values(file_data, "Email")
-            names_email = lists_to_dictionary(students, emails)
+            # every roster is validated and matched against the saved schedule
+            # before the first message goes out
+            reports, rosters = [], []
+            for record in data:
+                report = load_roster(record.get("file"), metrics)
+                rosters.append(report.match(EmailStudents({}, record).names()))
+                metrics.incr("rows_rejected", len(report.rejects))
+                reports.append((record.get("file"), report))
+            report_rejects(reports, args)
+            sender = EmailStudents.prompt_sender(verbose=False)
+            for record, names_email in zip(data, rosters):
+                send_emails(EmailStudents(names_email, record, sender), metrics)
+
+    for time_range, contained in ((args.between, True), (args.overlaps, False)):
+        if not time_range:
+            continue
+        with metrics.span("sessions"):
+            try:
+                sessions = db.sessions(*time_range, args.day, contained)
+            except ValueError as e:
+                sys.exit(str(e))
+        for sh in sessions:
+            if args.fmt == "jsonl":
+                print(json.dumps(sh))
+            else:
+                print(
+                    f"{sh['start_time']}-{sh['end_time']}  {sh['day'] or '-'}  "
+                    f"{sh['course'] or '-'}  id {sh['id']} session {sh['session_number']}"
+                )
 
-            mail = EmailStudents(names_email, data)
-            mail.send_email()
+    if args.diff:
+        record_id, old, new = args.diff
+        if not (old.isdigit() and new.isdigit()):
+            sys.exit(f"versions must be whole numbers, got {old} and {new}")
+        with metrics.span("diff"):
+            try:
+                moves = db.diff(record_id, int(old), int(new))
+            except ValueError as e:
+                sys.exit(str(e))
+        for move in moves:
+            if args.fmt == "jsonl":
+                print(json.dumps(move))
+            else:
+                print(
+                    f"{move['name']}: {placement(move['from'])} -> {placement(move['to'])}"
+                )
 
     if args.delete:
-        data = db.delete(*args.delete)
-        SchedulerFormatter(data)
+        with metrics.span("delete"):
+            db.delete(*args.delete)
+        metrics.incr("bytes_written", db.bytes_written)
+
+    if args.expire is not False:
+        with metrics.span("expire"):
+            try:
+                expired = db.expire(args.expire)
+            except ValueError as e:
+                sys.exit(str(e))
+        metrics.incr("bytes_written", db.bytes_written)
+        print(f"{len(expired)} shards expired")
+
+    if args.import_file or args.export:
+        from models.transfer import export_records, import_records
+
+    if args.import_file:
+        batch_size = args.batch_size
+        if not hasattr(db, "expire"):
+            # the single file holds the whole archive and every save rewrites it,
+            # batches would only make the import quadratic
+            print(
+                "warning: the single file layout keeps the archive in memory and "
+                "saves the import at once, use DB_LAYOUT=sharded for large archives",
+                file=sys.stderr,
+            )
+            batch_size = None
+        with metrics.span("import"):
+            counts = import_records(db, args.import_file, batch_size)
+        metrics.incr("imported", counts["imported"])
+        print(
+            f"{counts['imported']} schedules imported, "
+            f"{counts['duplicates']} duplicates skipped"
+        )
+
+    if args.export:
+        with metrics.span("export"):
+            exported = export_records(db, args.export)
+        metrics.incr("exported", exported)
+        print(f"{exported} schedules exported", file=sys.stderr)
+
+
+def generator_function(args: argparse.Namespace, metrics: Optional[Metrics] = None):
+    from util.generator import write_roster, write_archive
+
+    metrics = metrics or Metrics()
+    with metrics.span("generate"):
+        if args.kind == "roster":
+            write_roster(args.file, args.rows, args.seed)
+        elif args.kind == "archive":
+            # the ids are reserved like saved schedules so the archive can be loaded
+            # next to the existing database without collisions
+            ids = database_class().reserve_ids(args.schedules)
+            write_archive(
+                args.file,
+                args.schedules,
+                args.students,
+                args.seed,
+                args.npsg,
+                int(ids[0]) if ids else 1,
+            )
+    if args.file != "-":
+        metrics.incr("bytes_written", os.path.getsize(args.file))
+
+
+def serve_function(args: argparse.Namespace, metrics: Optional[Metrics] = None):
+    # the http server is only imported when serving
+    from models.service import ScheduleService, create_server
+
+    metrics = metrics or Metrics()
+    with metrics.span("load"):
+        service = ScheduleService(cache_size=args.cache_size)
+    server = create_server(service, args.host, args.port)
+    print(f"serving on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def stats_function(args: argparse.Namespace, metrics: Optional[Metrics] = None):
+    metrics = metrics or Metrics()
+    records = None
+    with metrics.span("load"):
+        db_name, stats_dir = database_class().locate()
+        stats = ScheduleStats(stats_dir)
+        if not materialized(args.by):
+            # too fine grained to be kept, counted from the schedules instead
+            records = open_database().iter_records()
+        # only the requested aggregate is read unless the database changed since
+        elif not path.exists(db_name) or not stats.fresh(db_name):
+            stats = open_database().stats
+    with metrics.span("stats"):
+        rows = stats.query(args.by, records)
+    if args.json:
+        for row in rows:
+            print(json.dumps(row))
+        return
+    if not rows:
+        print("no schedules")
+        return
+    columns = list(rows[0])
+    widths = [
+        max(len(column), *(len(str(row[column])) for row in rows)) for column in columns
+    ]
+    print(
+        "  ".join(
+            f"{column.upper():<{width}}" for column, width in zip(columns, widths)
+        )
+    )
+    for row in rows:
+        print(
+            "  ".join(
+                f"{str(row[column]):<{width}}" for column, width in zip(columns, widths)
+            )
+        )
 
 
 def main():
     load_dotenv()
-    parser = InputParser(shfunc=scheduler_function, dbfunc=database_function)
+    parser = InputParser(
+        shfunc=scheduler_function,
+        dbfunc=database_function,
+        genfunc=generator_function,
+        servefunc=serve_function,
+        statsfunc=stats_function,
+    )
     args = parser.parse_args()
 
-    args.func(args)
+    metrics = Metrics()
+    try:
+        if args.profile:
+            profile(lambda: args.func(args, metrics), args.profile)
+        else:
+            args.func(args, metrics)
+    finally:
+        # commands stop through sys.exit too, their stages are still reported
+        if args.metrics:
+            metrics.dump(args.metrics)
 
 
 if __name__ == "__main__":
@@ -1,16 +1,13 @@
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 from datetime import timedelta
-from dotenv import set_key, dotenv_values
-from typing import List, Dict, Any, Optional, Union, Callable
+from typing import List, Dict, Any, Optional, Union, Callable, Tuple, Iterator
 from itertools import chain
 from util import shuffle_ls, convert_str_to_timedelta_obj, check_valid_email
-from os import getenv, path
+from models.formatter import SchedulerFormatter
+from models.stats import ScheduleStats, DIMENSIONS, materialized
+from os import environ, getenv, path
 import argparse
 import json
 import math
-import smtplib
-import ssl
 
 
 class Scheduler:
@@ -243,63 +240,122 @@ class EmailStudents:
         self,
         name_and_email: List[Dict[str, str]],
         data: Dict,
+        sender: Optional["EmailSender"] = None,
     ):
+        """
+        :param name_and_email: mapping of student name to email
+        :param data: schedule data (as stored in the database)
+        :param sender: (Optional) sender to use, the user is prompted for credentials if not given
+        """
         self.name_and_email = name_and_email
         self.data = data
+        self.sender = sender
+        self.sent = 0
+
+    def send_email(self, progress: Optional[Callable[[int, int], None]] = None):
+        """
+        Sends every student in the schedule their session details
+        :param progress: (Optional) called with (sent, total) after each message
+        """
 
-    def send_email(self):
-        def send(body: str):
+        def send(name: str, body: str, sh: Dict, group_no: Optional[str] = None):
+            if name not in self.name_and_email:
+                # students without a valid roster entry are reported before sending
+                return
             new_body = body + "\n\nSigned\nManagement\n\n"
             # print(new_body)
+            attachments = []
+            if ics.available:
+                attachments.append(("session.ics", ics.attachment(sh, group_no)))
             email_obj = Email(
-                self.name_and_email[name], self.data.get("subject"), new_body
+                self.name_and_email[name],
+                self.data.get("subject"),
+                new_body,
+                attachments,
             )
-            es = EmailSender(sender_email, sender_password)
-            if name in ["Domenica Mgbe"]:
-                # print("sent to Dome")
-                es.send_email(email_obj)
-
-        if getenv("SENDER_EMAIL"):
-            sender_email = getenv("SENDER_EMAIL")
-        else:
-            sender_email = input("Please enter your email: ")
+            es.send_email(email_obj)
+            self.sent += 1
+            if progress:
+                progress(self.sent, total)
 
-        sender_password = input(
-            "Please enter your password(Google application password): "
-        )
+        es = self.sender or self.prompt_sender()
+        total = self.count_recipients()
         body = Body(self.data)
-        for sh in self.data["schedule"]:
-            if isinstance(sh["groups"], dict):
-                for group_no, names in sh["groups"].items():
-                    for name in names:
+        # only imported when mail is sent
+        from models.ical import SessionCalendar
+
+        ics = SessionCalendar(self.data)
+        try:
+            for sh in self.data["schedule"]:
+                if isinstance(sh["groups"], dict):
+                    for group_no, names in sh["groups"].items():
+                        for name in names:
+                            send(
+                                name,
+                                body(
+                                    name=name,
+                                    group_number=group_no,
+                                    start_time=sh.get("start_time"),
+                                    end_time=sh.get("end_time"),
+                                    session_number=sh.get("session_number"),
+                                ),
+                                sh,
+                                group_no,
+                            )
+                elif isinstance(sh["groups"], list):
+                    for name in sh["groups"]:
                         send(
+                            name,
                             body(
                                 name=name,
-                                group_number=group_no,
                                 start_time=sh.get("start_time"),
                                 end_time=sh.get("end_time"),
                                 session_number=sh.get("session_number"),
-                            )
-                        )
-            elif isinstance(sh["groups"], list):
-                for name in sh["groups"]:
-                    send(
-                        body(
-                            name=name,
-                            start_time=sh.get("start_time"),
-                            end_time=sh.get("end_time"),
-                            session_number=sh.get("session_number"),
+                            ),
+                            sh,
                         )
-                    )
+        finally:
+            es.close()
+
+    def names(self) -> Iterator[str]:
+        """
+        Every student in the schedule
+        """
+        for sh in self.data["schedule"]:
+            if isinstance(sh["groups"], dict):
+                for names in sh["groups"].values():
+                    yield from names
+            else:
+                yield from sh["groups"]
+
+    def count_recipients(self) -> int:
+        return sum(1 for name in self.names() if name in self.name_and_email)
+
+    @staticmethod
+    def prompt_sender(verbose: bool = True) -> "EmailSender":
+        if getenv("SENDER_EMAIL"):
+            sender_email = getenv("SENDER_EMAIL")
+        else:
+            sender_email = input("Please enter your email: ")
+
+        sender_password = input(
+            "Please enter your password(Google application password): "
+        )
+        return EmailSender(sender_email, sender_password, verbose=verbose)
 
 
 class Body:
+    # bookkeeping fields of saved schedules that are never shown to students
+    INTERNAL_KEYS = ("revisions",)
+
     def __init__(self, db_data=None):
         self.base_body = []
         self.append("Below is details of your Practical session")
         if db_data:
             ignored_keys = getenv("IGNORED_KEYS", [])
             for key, value in db_data.items():
+                if key in self.INTERNAL_KEYS:
+                    continue
                 if key not in ignored_keys and value is not None:
                     string = f"{key}: {value}".upper()
                     self.append(string)
@@ -350,11 +406,22 @@ class Body:
 
 class Email:
     def __init__(
-        self, receiver_email: str = None, subject: str = None, body: Any = None
+        self,
+        receiver_email: str = None,
+        subject: str = None,
+        body: Any = None,
+        attachments: Optional[List[Tuple[str, str]]] = None,
     ) -> None:
+        """
+        :param receiver_email: email of the receiver
+        :param subject: subject of the email
+        :param body: plain text body
+        :param attachments: (Optional) list of (file name, content) of calendar attachments
+        """
         self.receiver_email = receiver_email
         self.subject = subject
         self.body = body
+        self.attachments = attachments or []
 
     @property
     def receiver_email(self):
@@ -363,17 +430,84 @@ class Email:
     @receiver_email.setter
     def receiver_email(self, email):
         if type(email) is not str:
-            return TypeError("Invalid email")
+            raise TypeError("Invalid email")
 
         check_valid_email(email)
 
         self.__receiver_email = email
 
 
+class SMTPTransport:
+    """
+    Delivers messages over a single SMTP connection that is opened on first use
+    and reused for every following message
+    """
+
+    def __init__(self, host: str = "smtp.gmail.com", port: int = 587) -> None:
+        self.host = host
+        self.port = port
+        self.server = None
+
+    def send(
+        self, sender_email: str, sender_passwd: str, receiver_email: str, text: str
+    ):
+        if self.server is None:
+            # mail modules are only imported when a message is actually sent
+            import smtplib
+            import ssl
+
+            server = smtplib.SMTP(self.host, self.port)
+            context = ssl.create_default_context()
+            server.starttls(context=context)
+            server.login(sender_email, sender_passwd)
+            self.server = server
+        self.server.sendmail(sender_email, receiver_email, text)
+
+    def close(self):
+        if self.server is not None:
+            self.server.quit()
+            self.server = None
+
+
+class MemoryTransport:
+    """
+    Keeps messages in memory instead of delivering them. Used for testing and benchmarks
+    """
+
+    def __init__(self) -> None:
+        self.outbox: List[Dict[str, str]] = []
+
+    def send(
+        self, sender_email: str, sender_passwd: str, receiver_email: str, text: str
+    ):
+        self.outbox.append(
+            {"from": sender_email, "to": receiver_email, "message": text}
+        )
+
+    def close(self):
+        pass
+
+
 class EmailSender:
-    def __init__(self, sender_email: str, sender_passwd: str) -> None:
+    def __init__(
+        self,
+        sender_email: str,
+        sender_passwd: str,
+        transport: Union[SMTPTransport, MemoryTransport, None] = None,
+        verbose: bool = True,
+    ) -> None:
+        """
+        :param sender_email: email to send from
+        :param sender_passwd: password of the sender email
+        :param transport: (Optional) transport used to deliver messages, defaults to SMTP
+        :param verbose: print a line for every message sent
+        """
         self.sender_email = sender_email
         self.sender_passwd = sender_passwd
+        self.transport = transport or SMTPTransport()
+        self.verbose = verbose
+        # attachments shared by many messages are only encoded once
+        self.parts: Dict[Tuple[str, str], Any] = {}
 
     @property
     def sender_email(self):
@@ -382,7 +516,7 @@ class EmailSender:
     @sender_email.setter
     def sender_email(self, email: str):
         if type(email) is not str:
-            return TypeError("Invalid email")
+            raise TypeError("Invalid email")
 
         check_valid_email(email)
 
@@ -397,31 +531,47 @@ class EmailSender:
         self.__sender_passwd = passwd
 
     def send_email(self, email: Email):
+        # mail modules are only imported when a message is actually sent
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
         msg = MIMEMultipart()
         msg["From"] = self.sender_email
         msg["To"] = email.receiver_email
         msg["Subject"] = email.subject
         msg.attach(MIMEText(email.body, "plain"))
+        for attachment in email.attachments:
+            if (part := self.parts.get(attachment)) is None:
+                filename, content = attachment
+                part = MIMEText(content, "calendar", "utf-8")
+                part.set_param("method", "PUBLISH")
+                part.add_header("Content-Disposition", "attachment", filename=filename)
+                self.parts[attachment] = part
+            msg.attach(part)
 
         try:
-            server = smtplib.SMTP("smtp.gmail.com", 587)
-            context = ssl.create_default_context()
-            server.starttls(context=context)
-            server.login(self.sender_email, self.sender_passwd)
             text = msg.as_string()
-            server.sendmail(self.sender_email, email.receiver_email, text)
-            server.quit()
-            print("sent successfully... haha")
+            self.transport.send(
+                self.sender_email, self.sender_passwd, email.receiver_email, text
+            )
+            if self.verbose:
+                print("sent successfully... haha")
         except Exception as e:
             print("Failed to send email")
             raise e
 
+    def close(self):
+        self.transport.close()
+
 
 class InputParser:
     def __init__(
         self,
         dbfunc: Callable[[argparse.Namespace], None],
         shfunc: Callable[[argparse.Namespace], None],
+        genfunc: Optional[Callable[[argparse.Namespace], None]] = None,
+        servefunc: Optional[Callable[[argparse.Namespace], None]] = None,
+        statsfunc: Optional[Callable[[argparse.Namespace], None]] = None,
     ):
         self.parser = argparse.ArgumentParser(
             description="Process input for the application.",
@@ -465,6 +615,54 @@ class InputParser:
         )
         self.parser.add_argument("--day", help="day of the week for the practical")
         self.parser.add_argument("--date", help="date for the practical")
+        self.parser.add_argument(
+            "--weeks",
+            type=int,
+            help="number of weeks a practical given by --day repeats for in the "
+            "calendar events (default 12)",
+        )
+        self.parser.add_argument(
+            "--format",
+            dest="fmt",
+            choices=SchedulerFormatter.FORMATS,
+            default="text",
+            help="output format of the displayed schedule",
+        )
+        self.parser.add_argument(
+            "-o",
+            "--output",
+            help="write the displayed schedule to this file instead of the terminal",
+        )
+        self.parser.add_argument(
+            "--slot",
+            help="only display this session number (for example: 2)",
+        )
+        self.parser.add_argument(
+            "--group",
+            help="only display this group (for example: 1 or 'group 1')",
+        )
+        self.parser.add_argument(
+            "--ics",
+            help="write the calendar events of the displayed schedules to this .ics file",
+        )
+        self.parser.add_argument(
+            "--rejects",
+            help="write the roster rows rejected by validation to this csv file",
+        )
+        self.parser.add_argument(
+            "--strict",
+            default=False,
+            action="store_true",
+            help="stop before scheduling or sending if any roster row is rejected",
+        )
+        self.parser.add_argument(
+            "--metrics",
+            help="write a json report of stage timings and counters to this file",
+        )
+        self.parser.add_argument(
+            "--profile",
+            help="run under cProfile and tracemalloc and write the results to this file",
+        )
 
         schedule_parser.add_argument(
             "-f",
@@ -507,6 +705,14 @@ class InputParser:
             nargs=2,
             help="retrive data by key passed from database",
         )
+        dbparser.add_argument(
+            "--diff",
+            type=str,
+            dest="diff",
+            nargs=3,
+            metavar=("ID", "V1", "V2"),
+            help="list students moved between two versions of a schedule",
+        )
         dbparser.add_argument(
             "--del",
             type=str,
@@ -514,64 +720,171 @@ class InputParser:
             nargs=2,
             help="delete data by key passed from database",
         )
+        dbparser.add_argument(
+            "--between",
+            nargs=2,
+            dest="between",
+            metavar=("START", "END"),
+            help="list the sessions that run within START-END (for example: "
+            "12:00:00 15:00:00), only on --day if given",
+        )
+        dbparser.add_argument(
+            "--overlaps",
+            nargs=2,
+            dest="overlaps",
+            metavar=("START", "END"),
+            help="list the sessions that overlap START-END, only on --day if given",
+        )
+        dbparser.add_argument(
+            "--export",
+            dest="export",
+            metavar="FILE",
+            help="stream every schedule to FILE as NDJSON, or CSV for .csv files "
+            "('-' for stdout)",
+        )
+        dbparser.add_argument(
+            "--import",
+            dest="import_file",
+            metavar="FILE",
+            help="add the schedules of an NDJSON/CSV export, with new ids and "
+            "skipping duplicates ('-' for stdin). The single file layout holds the "
+            "whole archive in memory and saves the import at once, use "
+            "DB_LAYOUT=sharded for archives that do not fit in memory",
+        )
+        dbparser.add_argument(
+            "--batch-size",
+            dest="batch_size",
+            type=int,
+            default=10000,
+            help="number of imported schedules saved at a time (DB_LAYOUT=sharded)",
+        )
+        dbparser.add_argument(
+            "--expire",
+            type=int,
+            dest="expire",
+            nargs="?",
+            # --expire without N keeps RETENTION_SESSIONS sessions
+            default=False,
+            const=None,
+            metavar="N",
+            help="drop the shards of all but the newest N sessions "
+            "(sharded layout, default RETENTION_SESSIONS)",
+        )
+        dbparser.add_argument(
+            "--migrate",
+            dest="migrate",
+            metavar="FILE",
+            help="split a single file database into the shards (sharded layout)",
+        )
         dbparser.set_defaults(func=dbfunc)
 
+        if genfunc is not None:
+            generate_parser = sub_parser.add_parser("generate", help="generate --help")
+            kind_parser = generate_parser.add_subparsers(dest="kind", required=True)
+            roster_parser = kind_parser.add_parser(
+                "roster", help="synthetic roster csv of names and emails"
+            )
+            roster_parser.add_argument(
+                "-n",
+                "--rows",
+                type=int,
+                default=20,
+                help="number of students to generate",
+            )
+            archive_parser = kind_parser.add_parser(
+                "archive",
+                help="synthetic db.json style schedule archive, its ids are taken "
+                "from CURRENT_DB_ID",
+            )
+            archive_parser.add_argument(
+                "-n",
+                "--schedules",
+                type=int,
+                default=100,
+                help="number of schedules to generate",
+            )
+            archive_parser.add_argument(
+                "--students",
+                type=int,
+                default=30,
+                help="number of students in each schedule",
+            )
+            archive_parser.add_argument(
+                "--npsg",
+                default="3",
+                help="Number of students per subgroup (optional)",
+            )
+            for parser in (roster_parser, archive_parser):
+                parser.add_argument(
+                    "-f",
+                    "--file",
+                    dest="file",
+                    required=True,
+                    help="path to write to, '-' for stdout",
+                )
+                parser.add_argument(
+                    "--seed", type=int, help="seed for reproducible output"
+                )
+            generate_parser.set_defaults(func=genfunc)
+
+        if servefunc is not None:
+            serve_parser = sub_parser.add_parser("serve", help="serve --help")
+            serve_parser.add_argument("--host", default="127.0.0.1")
+            serve_parser.add_argument("--port", type=int, default=8000)
+            serve_parser.add_argument(
+                "--cache-size",
+                dest="cache_size",
+                type=int,
+                default=256,
+                help="number of rendered schedules kept in memory",
+            )
+            serve_parser.set_defaults(func=servefunc)
+
+        if statsfunc is not None:
+            stats_parser = sub_parser.add_parser("stats", help="stats --help")
+            stats_parser.add_argument(
+                "-b",
+                "--by",
+                nargs="*",
+                default=[],
+                choices=DIMENSIONS,
+                help="group the statistics by these fields, slot with two or more "
+                "others is counted from the schedules",
+            )
+            stats_parser.add_argument(
+                "--json",
+                default=False,
+                action="store_true",
+                help="print one json object per row",
+            )
+            stats_parser.set_defaults(func=statsfunc)
+
     def parse_args(self):
         args = self.parser.parse_args()
         return args
 
 
-class SchedulerFormatter:
-    def __init__(self, data):
-        self.data = data
-
-    def format(self, data=None):
-        if not isinstance(self.data, list):
-            raise TypeError("data must be a list")
-        for d in self.data:
-            print(f"{'*':*^100}")
-            if course := d.get("course"):
-                print(f"{course:^100}")
-            if date := d.get("date"):
-                print(f"{date:^100}")
-            if day := d.get("day"):
-                print("{:^100}".format(f"DAY: {day.upper()}"))
-            if semester := d.get("semester"):
-                print("{:^100}".format(f"SEMESTER: {semester.upper()}"))
-            if session := d.get("session"):
-                print("{:^100}".format(f"SEMESTER: {session.upper()}"))
-            if (start_time := d.get("start_time")) and (end_time := d.get("end_time")):
-                print("{:^100}".format(f"TIME: {start_time} - {end_time}"))
-            print(f"{'*':*^100}")
-
-            schedule = d.get("schedule")
-            for sh in schedule:
-                session_number = sh.get("session_number")
-                start_time = sh.get("start_time")
-                end_time = sh.get("end_time")
-                print("{:^100}".format(f"SESSION NUMBER: {session_number}"))
-                print("{:^100}".format(f"TIME: {start_time} - {end_time}"))
-
-                print(f"{'-':-^100}")
-
-                groups = sh.get("groups")
-                if isinstance(groups, list):
-                    for i in range(len(groups)):
-                        print("{} {}".format(i + 1, groups[i].upper()))
-                    print(f"{'*':*^100}")
-                else:
-                    for group_no, names in sh["groups"].items():
-                        print("{:^50}".format(f"{group_no.upper()}"))
-                        for i in range(len(names)):
-                            print("{} {}".format(i + 1, names[i].upper()))
-                        print(f"{'-':-^100}")
-                    print(f"{'*':*^100}")
-
-
 class Database:
     def __init__(self):
-        self.db_name = getenv("DB_NAME")
+        self.db_name = self.locate()[0]
+        # lazily built lookup tables of key -> value -> records used by retrieve
+        self.indexes: Dict[str, Dict[Any, List[dict]]] = {}
+        # lazily built SessionIndex (models.intervals) over the session times
+        self.intervals = None
+        self.__stats: Optional[ScheduleStats] = None
+        # bytes of database and aggregate files written by the last write
+        self.bytes_written = 0
+        self.open()
+
+    @classmethod
+    def locate(cls) -> Tuple[str, str]:
+        """
+        :return: (database file, statistics directory) without opening the database
+        """
+        db_name = getenv("DB_NAME")
+        return db_name, f"{db_name}.stats"
 
+    def open(self):
         if not path.exists(self.db_name):
             self.db = []
             self.write("a")
@@ -579,34 +892,197 @@ class Database:
             self.db = self.load()
 
     def save(self, data: dict):
+        """
+        Saves a schedule. Saving again under an existing id adds a new version of that
+        schedule instead of a second copy
+        :return: id of the saved schedule
+        """
+        if data.get("id") is not None and (existing := self.retrieve("id", data["id"])):
+            return self.revise(existing[-1], data)
+
         if data.get("id") is None:
-            current_id = getenv("CURRENT_DB_ID")
-            new_id = str(int(current_id) + 1)
-            data.update({"id": new_id})
-            set_key(".env", "CURRENT_DB_ID", new_id)
-            env_var = dotenv_values(".env")
-            with open(".env", "w") as file:
-                for key, value in env_var.items():
-                    file.write(f"{key}={value}\n")
+            self.assign_id(data)
 
-        self.db.append(data)
+        self.stats.add(data)
+        self.append(data)
         self.write()
+        self.bytes_written += self.stats.write(self.db_name)
         return data.get("id")
 
+    def append(self, data: dict):
+        self.db.append(data)
+        for key, index in self.indexes.items():
+            self.add_to_index(index, key, data)
+        self.intervals = None
+
+    def save_many(self, records: List[dict]) -> List[str]:
+        """
+        Saves new schedules with a single write, ids are assigned to the records
+        without one
+        :return: ids of the saved schedules
+        """
+        new_ids = iter(self.reserve_ids(sum(1 for r in records if r.get("id") is None)))
+        stats = self.stats
+        for data in records:
+            if data.get("id") is None:
+                data["id"] = next(new_ids)
+            stats.add(data)
+            self.append(data)
+        self.write()
+        self.bytes_written += stats.write(self.db_name)
+        return [data["id"] for data in records]
+
+    def iter_records(self) -> Iterator[dict]:
+        yield from self.db
+
+    @staticmethod
+    def reserve_ids(count: int) -> List[str]:
+        """
+        Takes the next count ids from CURRENT_DB_ID, updating .env once
+        """
+        if not count:
+            return []
+        from dotenv import set_key, dotenv_values
+
+        current_id = int(getenv("CURRENT_DB_ID"))
+        new_id = str(current_id + count)
+        # keep the process environment in step for long running processes
+        environ["CURRENT_DB_ID"] = new_id
+        set_key(".env", "CURRENT_DB_ID", new_id)
+        env_var = dotenv_values(".env")
+        with open(".env", "w") as file:
+            for key, value in env_var.items():
+                file.write(f"{key}={value}\n")
+        return [str(current_id + i) for i in range(1, count + 1)]
+
+    def assign_id(self, data: dict):
+        data.update({"id": self.reserve_ids(1)[0]})
+
+    def revise(self, record: dict, data: dict):
+        """
+        Makes data the latest version of a saved record, storing only what changed
+        """
+        from models.versions import add_revision
+
+        self.stats.remove(record)
+        add_revision(record, data["schedule"], data)
+        self.stats.add(record)
+        self.reset_indexes()
+        self.write()
+        self.bytes_written += self.stats.write(self.db_name)
+        return record.get("id")
+
+    def record(self, record_id: str) -> dict:
+        if not (records := self.retrieve("id", record_id)):
+            raise ValueError(f"no schedule with id {record_id}")
+        return records[-1]
+
+    def version(self, record_id: str, version: int) -> dict:
+        """
+        A saved schedule, with its fields, as it was at version
+        """
+        from models.versions import fields_at, schedule_at
+
+        record = self.record(record_id)
+        data = fields_at(record, version)
+        data["schedule"] = schedule_at(record, version)
+        data["version"] = version
+        return data
+
+    def diff(self, record_id: str, old: int, new: int) -> List[dict]:
+        """
+        Students moved between two versions of a saved schedule
+        """
+        from models.versions import diff
+
+        return diff(self.record(record_id), old, new)
+
     def retrieve(self, key, value):
-        correspond_data = []
-        for data in self.db:
-            if data.get(key) == value:
-                correspond_data.append(data)
-        return correspond_data
+        return list(self.index(key).get(value, []))
 
     def delete(self, key, value):
+        """
+        Deletes every record whose key equals value
+        :return: the deleted records
+        """
+        stats = self.stats
         new_db = []
+        deleted = []
         for i in range(len(self.db)):
             if self.db[i].get(key) != value:
                 new_db.append(self.db[i])
+            else:
+                deleted.append(self.db[i])
         self.db = new_db
+        if deleted:
+            self.reset_indexes()
+            for data in deleted:
+                stats.remove(data)
         self.write()
+        self.bytes_written += stats.write(self.db_name)
+        return deleted
+
+    @property
+    def stats(self) -> ScheduleStats:
+        """
+        Aggregates of the database, kept in a directory next to it and loaded on
+        first use. They are rebuilt if the database was changed by something else.
+        """
+        if self.__stats is None:
+            db_name, stats_dir = self.locate()
+            stats = ScheduleStats(stats_dir)
+            if stats.fresh(db_name):
+                stats.load_all()
+            else:
+                stats.rebuild(self.db)
+                stats.write(db_name)
+            self.__stats = stats
+        return self.__stats
+
+    @stats.setter
+    def stats(self, stats: Optional[ScheduleStats]):
+        # None drops the loaded aggregates, they are reloaded (or rebuilt) on next use
+        self.__stats = stats
+
+    def index(self, key) -> Dict[Any, List[dict]]:
+        """
+        Returns the value -> records lookup table for key, building it on first use
+        """
+        if key not in self.indexes:
+            index = {}
+            for data in self.db:
+                self.add_to_index(index, key, data)
+            self.indexes[key] = index
+        return self.indexes[key]
+
+    def reset_indexes(self):
+        self.indexes = {}
+        self.intervals = None
+
+    def sessions(
+        self,
+        start: str,
+        end: str,
+        day: Optional[str] = None,
+        contained: bool = False,
+    ) -> List[dict]:
+        """
+        Sessions of every saved schedule overlapping the time range start-end, or
+        lying within it when contained is set. See SessionIndex.query
+        """
+        if self.intervals is None:
+            from models.intervals import SessionIndex
+
+            self.intervals = SessionIndex(self.db)
+        return self.intervals.query(start, end, day, contained)
+
+    @staticmethod
+    def add_to_index(index: Dict[Any, List[dict]], key, data: dict):
+        try:
+            index.setdefault(data.get(key), []).append(data)
+        except TypeError:
+            # unhashable values (e.g the schedule itself) are never looked up
+            pass
 
     def read(self):
         with open(self.db_name) as fd:
@@ -616,6 +1092,23 @@ class Database:
     def write(self, mode="w"):
         with open(self.db_name, mode) as fd:
             json.dump(self.db, fd)
+        self.bytes_written = path.getsize(self.db_name)
 
     def load(self):
         return self.read()
+
+
+def database_class() -> type:
+    """
+    Storage layout selected by DB_LAYOUT ("file", the default, or "sharded")
+    """
+    if getenv("DB_LAYOUT") == "sharded":
+        # only imported for the sharded layout
+        from models.shards import ShardedDatabase
+
+        return ShardedDatabase
+    return Database
+
+
+def open_database() -> Database:
+    return database_class()()
@@ -0,0 +1,230 @@
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+import csv
+import html
+import io
+import json
+import sys
+
+
+class BufferedWriter:
+    """
+    Collects small strings and writes them to the sink in large chunks
+    """
+
+    def __init__(self, out: TextIO, buffer_size: int = 64 * 1024):
+        self.out = out
+        self.buffer_size = buffer_size
+        self.chunks: List[str] = []
+        self.size = 0
+
+    def write(self, string: str):
+        self.chunks.append(string)
+        self.size += len(string)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.chunks:
+            self.out.write("".join(self.chunks))
+            self.chunks = []
+            self.size = 0
+        if hasattr(self.out, "flush"):
+            self.out.flush()
+
+
+class SchedulerFormatter:
+    """
+    Renders saved or freshly generated schedules to a file-like sink.
+    Supported formats are text (the default terminal layout), csv, jsonl and html
+    """
+
+    FORMATS = ("text", "csv", "jsonl", "html")
+    FIELDS = [
+        "id",
+        "course",
+        "session",
+        "semester",
+        "day",
+        "date",
+        "session_number",
+        "start_time",
+        "end_time",
+        "group",
+        "position",
+        "name",
+    ]
+    WIDTH = 100
+
+    def __init__(
+        self,
+        data,
+        out: Optional[TextIO] = None,
+        fmt: str = "text",
+        session_number: Optional[str] = None,
+        group: Optional[str] = None,
+        buffer_size: int = 64 * 1024,
+    ):
+        """
+        :param data: list of schedule records (as stored in the database)
+        :param out: (Optional) file-like object to write to, defaults to stdout
+        :param fmt: output format, one of FORMATS
+        :param session_number: (Optional) only render this session number
+        :param group: (Optional) only render this group, e.g "group 1" or "1"
+        :param buffer_size: number of characters collected before each write
+        """
+        if fmt not in self.FORMATS:
+            raise ValueError(f"format must be one of {', '.join(self.FORMATS)}")
+        self.data = data
+        self.out = out
+        self.fmt = fmt
+        self.session_number = session_number
+        self.group = group
+        self.buffer_size = buffer_size
+
+    @property
+    def group(self):
+        return self.__group
+
+    @group.setter
+    def group(self, group: Optional[str]):
+        if group is not None and not str(group).startswith("group "):
+            group = f"group {group}"
+        self.__group = group
+
+    def format(self, data=None):
+        data = self.data if data is None else data
+        if not isinstance(data, list):
+            raise TypeError("data must be a list")
+        writer = BufferedWriter(self.out or sys.stdout, self.buffer_size)
+        for chunk in self.render(data):
+            writer.write(chunk)
+        writer.flush()
+
+    def render(self, data: List[Dict]) -> Iterator[str]:
+        """
+        Lazily yields the rendered output for data in the selected format
+        """
+        renderer = getattr(self, f"render_{self.fmt}")
+        return renderer(data)
+
+    def sessions(self, record: Dict) -> Iterator[Dict]:
+        """
+        Yields the sessions of a record that pass the session number filter
+        """
+        for sh in record.get("schedule") or []:
+            if self.session_number is not None and str(sh.get("session_number")) != str(
+                self.session_number
+            ):
+                continue
+            yield sh
+
+    def groups(self, sh: Dict) -> Iterator[Tuple[Optional[str], List[str]]]:
+        """
+        Yields (group name, names) for a session. Ungrouped sessions yield a single
+        (None, names) pair and are skipped entirely when a group filter is set
+        """
+        groups = sh.get("groups")
+        if isinstance(groups, list):
+            if self.group is None:
+                yield None, groups
+        else:
+            for group_no, names in groups.items():
+                if self.group is None or group_no == self.group:
+                    yield group_no, names
+
+    def rows(self, data: List[Dict]) -> Iterator[Dict[str, Any]]:
+        """
+        Flattens records into one row per student
+        """
+        for record in data:
+            meta = {key: record.get(key) for key in self.FIELDS[:6]}
+            for sh in self.sessions(record):
+                for group_no, names in self.groups(sh):
+                    for i, name in enumerate(names):
+                        row = dict(meta)
+                        row["session_number"] = sh.get("session_number")
+                        row["start_time"] = sh.get("start_time")
+                        row["end_time"] = sh.get("end_time")
+                        row["group"] = group_no
+                        row["position"] = i + 1
+                        row["name"] = name
+                        yield row
+
+    def render_text(self, data: List[Dict]) -> Iterator[str]:
+        width = self.WIDTH
+        stars = "*" * width + "\n"
+        dashes = "-" * width + "\n"
+        for d in data:
+            lines = [stars]
+            if course := d.get("course"):
+                lines.append(f"{course:^{width}}\n")
+            if date := d.get("date"):
+                lines.append(f"{date:^{width}}\n")
+            if day := d.get("day"):
+                lines.append(f"{'DAY: ' + day.upper():^{width}}\n")
+            if semester := d.get("semester"):
+                lines.append(f"{'SEMESTER: ' + semester.upper():^{width}}\n")
+            if session := d.get("session"):
+                lines.append(f"{'SESSION: ' + session.upper():^{width}}\n")
+            if (start_time := d.get("start_time")) and (end_time := d.get("end_time")):
+                lines.append(f"{f'TIME: {start_time} - {end_time}':^{width}}\n")
+            lines.append(stars)
+            yield "".join(lines)
+
+            for sh in self.sessions(d):
+                lines = [
+                    f"{'SESSION NUMBER: ' + str(sh.get('session_number')):^{width}}\n",
+                    f"{'TIME: {} - {}'.format(sh.get('start_time'), sh.get('end_time')):^{width}}\n",
+                    dashes,
+                ]
+                for group_no, names in self.groups(sh):
+                    if group_no is not None:
+                        lines.append(f"{group_no.upper():^{width // 2}}\n")
+                    for i, name in enumerate(names):
+                        lines.append(f"{i + 1} {name.upper()}\n")
+                    if group_no is not None:
+                        lines.append(dashes)
+                lines.append(stars)
+                yield "".join(lines)
+
+    def render_csv(self, data: List[Dict]) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.FIELDS)
+        writer.writeheader()
+        for row in self.rows(data):
+            writer.writerow(row)
+            if buffer.tell() >= self.buffer_size:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def render_jsonl(self, data: List[Dict]) -> Iterator[str]:
+        dumps = json.JSONEncoder(ensure_ascii=False).encode
+        for row in self.rows(data):
+            yield dumps(row) + "\n"
+
+    def render_html(self, data: List[Dict]) -> Iterator[str]:
+        escape = html.escape
+        yield '<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>Lab Schedule</title></head>\n<body>\n'
+        for d in data:
+            title = " ".join(
+                escape(str(d[key]))
+                for key in ("course", "day", "date", "semester", "session")
+                if d.get(key)
+            )
+            yield f"<h2>{title}</h2>\n<table>\n<tr><th>Session</th><th>Time</th><th>Group</th><th>#</th><th>Name</th></tr>\n"
+            for sh in self.sessions(d):
+                session_number = escape(str(sh.get("session_number")))
+                time = escape(f"{sh.get('start_time')} - {sh.get('end_time')}")
+                lines = []
+                for group_no, names in self.groups(sh):
+                    group = escape(group_no or "")
+                    for i, name in enumerate(names):
+                        lines.append(
+                            f"<tr><td>{session_number}</td><td>{time}</td><td>{group}</td>"
+                            f"<td>{i + 1}</td><td>{escape(name)}</td></tr>\n"
+                        )
+                yield "".join(lines)
+            yield "</table>\n"
+        yield "</body>\n</html>\n"
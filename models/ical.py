@@ -0,0 +1,181 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from util import convert_str_to_timedelta_obj
+import hashlib
+import json
+
+DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y"]
+PRODID = "-//Lab Scheduling App//EN"
+# weeks a practical given by its day of the week repeats for, unless set with --weeks
+DEFAULT_WEEKS = 12
+# fields that tell one practical apart from another when it has no id
+IDENTITY_FIELDS = ("course", "session", "semester", "day", "date", "start_time")
+
+
+def escape(text: str) -> str:
+    return (
+        str(text)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line: str) -> str:
+    """
+    Folds a content line to at most 75 octets as required by RFC 5545
+    """
+    if len(line.encode()) <= 75:
+        return line
+    parts = []
+    current = ""
+    for char in line:
+        if len((current + char).encode()) > (75 if not parts else 74):
+            parts.append(current)
+            current = ""
+        current += char
+    parts.append(current)
+    return "\r\n ".join(parts)
+
+
+def calendar(events: Iterable[str]) -> str:
+    """
+    Wraps rendered VEVENTs into a VCALENDAR
+    """
+    return "".join(
+        [
+            "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n",
+            f"PRODID:{PRODID}\r\nMETHOD:PUBLISH\r\nCALSCALE:GREGORIAN\r\n",
+            *events,
+            "END:VCALENDAR\r\n",
+        ]
+    )
+
+
+class SessionCalendar:
+    """
+    Builds iCalendar events for the sessions of a schedule.
+    Every event is rendered once per session/group and reused for all the students in
+    it, so the cost grows with the number of sessions and not the number of students
+    """
+
+    def __init__(self, data: Dict, today: Optional[date] = None):
+        """
+        :param data: schedule data (as stored in the database)
+        :param today: (Optional) reference date used when only a day of the week is known
+        """
+        self.data = data
+        self.today = today or date.today()
+        self.stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.first_date, self.weekly = self.resolve_date()
+        self.weeks = int(data.get("weeks") or DEFAULT_WEEKS)
+        self.identity = self.resolve_identity()
+        self.events: Dict[Tuple[int, Optional[str]], str] = {}
+        self.attachments: Dict[Tuple[int, Optional[str]], str] = {}
+
+    def resolve_date(self) -> Tuple[Optional[date], bool]:
+        """
+        Works out the date of the practical. An explicit date is used as is, a day of
+        the week becomes a weekly event starting on the next such day
+        :return: (date or None if unknown, whether the event repeats weekly)
+        """
+        if practical_date := self.data.get("date"):
+            for fmt in DATE_FORMATS:
+                try:
+                    return datetime.strptime(practical_date, fmt).date(), False
+                except ValueError:
+                    continue
+        if (day := self.data.get("day")) and day.lower() in DAYS:
+            days_ahead = (DAYS.index(day.lower()) - self.today.weekday()) % 7
+            return self.today + timedelta(days=days_ahead), True
+        return None, False
+
+    def resolve_identity(self) -> str:
+        """
+        Part of the event UIDs naming the practical: its id when saved, otherwise a
+        hash of its course, term, day and time so unsaved schedules of different
+        terms never share a UID
+        """
+        if record_id := self.data.get("id"):
+            return str(record_id)
+        fields = json.dumps([self.data.get(key) for key in IDENTITY_FIELDS])
+        return hashlib.sha1(fields.encode()).hexdigest()[:16]
+
+    @property
+    def available(self) -> bool:
+        return self.first_date is not None
+
+    def time(self, time: str) -> str:
+        start = datetime.combine(self.first_date, datetime.min.time())
+        return (start + convert_str_to_timedelta_obj(time)).strftime("%Y%m%dT%H%M%S")
+
+    def event(self, sh: Dict, group_no: Optional[str] = None) -> str:
+        """
+        Renders (once) the VEVENT of a session, or of one group of it
+        """
+        key = (sh.get("session_number"), group_no)
+        if (event := self.events.get(key)) is None:
+            course = self.data.get("course") or "Lab"
+            summary = f"{course} practical, session {sh.get('session_number')}"
+            if group_no:
+                summary += f", {group_no}"
+            uid = "-".join(
+                str(part)
+                for part in (
+                    course,
+                    self.data.get("session"),
+                    self.data.get("semester"),
+                    self.identity,
+                    *key,
+                )
+                if part is not None
+            ).replace(" ", "_")
+            lines = [
+                "BEGIN:VEVENT",
+                f"UID:{uid}@lab-scheduling-app",
+                f"DTSTAMP:{self.stamp}",
+                f"DTSTART:{self.time(sh['start_time'])}",
+                f"DTEND:{self.time(sh['end_time'])}",
+                f"SUMMARY:{escape(summary)}",
+            ]
+            if self.weekly:
+                lines.append(f"RRULE:FREQ=WEEKLY;COUNT={self.weeks}")
+            lines.append("END:VEVENT")
+            event = "".join(fold(line) + "\r\n" for line in lines)
+            self.events[key] = event
+        return event
+
+    def attachment(self, sh: Dict, group_no: Optional[str] = None) -> str:
+        """
+        Single event calendar for one session/group, shared by everyone in it
+        """
+        key = (sh.get("session_number"), group_no)
+        if (attachment := self.attachments.get(key)) is None:
+            attachment = calendar([self.event(sh, group_no)])
+            self.attachments[key] = attachment
+        return attachment
+
+    def all_events(self) -> Iterable[str]:
+        for sh in self.data.get("schedule") or []:
+            if isinstance(sh["groups"], dict):
+                for group_no in sh["groups"]:
+                    yield self.event(sh, group_no)
+            else:
+                yield self.event(sh)
+
+
+def write_feed(records: List[Dict], file: str) -> int:
+    """
+    Writes the events of every record with a known date into one calendar feed
+    :return: number of events written
+    """
+    events = []
+    for data in records:
+        session_calendar = SessionCalendar(data)
+        if session_calendar.available:
+            events.extend(session_calendar.all_events())
+    with open(file, "w", newline="") as fd:
+        fd.write(calendar(events))
+    return len(events)
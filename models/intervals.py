@@ -0,0 +1,174 @@
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from models.ical import DATE_FORMATS, DAYS
+from util import convert_str_to_timedelta_obj
+
+# (start, end, payload), times in seconds since midnight, end excluded
+Interval = Tuple[int, int, Any]
+
+
+def seconds(time: str) -> int:
+    """
+    Seconds since midnight of a "hour:minute:second" (or "hour:minute") time
+    """
+    if len(time.split(":")) == 2:
+        time += ":00"
+    return int(convert_str_to_timedelta_obj(time).total_seconds())
+
+
+class Node:
+    def __init__(self, center: int, here: List[Interval]):
+        self.center = center
+        # every interval of the node contains center
+        self.by_start = sorted(here, key=lambda interval: interval[0])
+        self.by_end = sorted(here, key=lambda interval: interval[1], reverse=True)
+        self.left: Optional[Node] = None
+        self.right: Optional[Node] = None
+
+
+class IntervalTree:
+    """
+    Centered interval tree. Every node keeps the intervals containing its center
+    sorted by start and by end, so finding the k intervals overlapping a range takes
+    O(log n + k)
+    """
+
+    def __init__(self, intervals: List[Interval]):
+        self.size = len(intervals)
+        self.root = self.build(intervals)
+
+    @staticmethod
+    def build(intervals: List[Interval]) -> Optional[Node]:
+        root = None
+        # (intervals, parent, side) built iteratively to keep the stack shallow
+        pending: List[Tuple[List[Interval], Optional[Node], str]] = [
+            (intervals, None, "")
+        ]
+        while pending:
+            intervals, parent, side = pending.pop()
+            if not intervals:
+                continue
+            points = sorted(p for start, end, _ in intervals for p in (start, end))
+            # the lower median always falls inside at least one interval or splits them
+            center = points[(len(points) - 1) // 2]
+            left, here, right = [], [], []
+            for interval in intervals:
+                if interval[1] <= center:
+                    left.append(interval)
+                elif interval[0] > center:
+                    right.append(interval)
+                else:
+                    here.append(interval)
+            node = Node(center, here)
+            if parent is None:
+                root = node
+            else:
+                setattr(parent, side, node)
+            pending.append((left, node, "left"))
+            pending.append((right, node, "right"))
+        return root
+
+    def overlapping(self, start: int, end: int) -> Iterator[Interval]:
+        """
+        Intervals sharing at least a moment with [start, end)
+        """
+        pending = [self.root]
+        while pending:
+            node = pending.pop()
+            if node is None:
+                continue
+            if end <= node.center:
+                for interval in node.by_start:
+                    if interval[0] >= end:
+                        break
+                    yield interval
+                pending.append(node.left)
+            elif start > node.center:
+                for interval in node.by_end:
+                    if interval[1] <= start:
+                        break
+                    yield interval
+                pending.append(node.right)
+            else:
+                yield from node.by_start
+                pending.append(node.left)
+                pending.append(node.right)
+
+
+def record_day(data: dict) -> Optional[str]:
+    if day := data.get("day"):
+        return day.lower()
+    if practical_date := data.get("date"):
+        for fmt in DATE_FORMATS:
+            try:
+                return DAYS[datetime.strptime(practical_date, fmt).weekday()]
+            except ValueError:
+                continue
+    return None
+
+
+class SessionIndex:
+    """
+    Interval trees over the start and end time of every session of the saved
+    schedules, one per day of the week and one over all of them, built on first use
+    """
+
+    def __init__(self, records: List[dict]):
+        self.intervals: Dict[Optional[str], List[Interval]] = {None: []}
+        self.trees: Dict[Optional[str], IntervalTree] = {}
+        for data in records:
+            day = record_day(data)
+            for sh in data.get("schedule") or []:
+                start, end = seconds(sh["start_time"]), seconds(sh["end_time"])
+                if end <= start:
+                    # an empty session overlaps nothing
+                    continue
+                interval = (start, end, (data, sh))
+                self.intervals[None].append(interval)
+                self.intervals.setdefault(day, []).append(interval)
+
+    def tree(self, day: Optional[str] = None) -> IntervalTree:
+        day = day and day.lower()
+        if day not in self.trees:
+            self.trees[day] = IntervalTree(self.intervals.get(day, []))
+        return self.trees[day]
+
+    def query(
+        self,
+        start: str,
+        end: str,
+        day: Optional[str] = None,
+        contained: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        :param start: start of the time range ("12:00:00")
+        :param end: end of the time range
+        :param day: (Optional) only sessions of schedules on this day of the week
+        :param contained: only sessions that lie within the range instead of every
+        session overlapping it
+        :return: one row per session, ordered by start time
+        """
+        low, high = seconds(start), seconds(end)
+        if low >= high:
+            raise ValueError("the end of the time range must be after its start")
+        matches = [
+            interval
+            for interval in self.tree(day).overlapping(low, high)
+            if not contained or (low <= interval[0] and interval[1] <= high)
+        ]
+        matches.sort(key=lambda interval: (interval[0], interval[1]))
+        rows = []
+        for _, _, (data, sh) in matches:
+            rows.append(
+                {
+                    "id": data.get("id"),
+                    "course": data.get("course"),
+                    "session": data.get("session"),
+                    "semester": data.get("semester"),
+                    "day": data.get("day") or record_day(data),
+                    "session_number": sh.get("session_number"),
+                    "start_time": sh["start_time"],
+                    "end_time": sh["end_time"],
+                }
+            )
+        return rows
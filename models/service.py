@@ -0,0 +1,254 @@
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from copy import deepcopy
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import io
+import json
+import os
+import threading
+
+from models import Database, Scheduler, open_database
+from models.formatter import SchedulerFormatter
+from util import csv_parser
+from util.validation import validate_roster
+
+
+class ScheduleService:
+    """
+    Keeps the schedule database, parsed rosters and rendered schedules in memory so
+    repeated queries do not pay for loading them again
+    """
+
+    CONTENT_TYPES = {
+        "text": "text/plain; charset=utf-8",
+        "csv": "text/csv; charset=utf-8",
+        "jsonl": "application/x-ndjson",
+        "html": "text/html; charset=utf-8",
+        "json": "application/json; charset=utf-8",
+    }
+
+    def __init__(self, db: Optional[Database] = None, cache_size: int = 256):
+        """
+        :param db: (Optional) database to serve, loaded from DB_NAME if not given
+        :param cache_size: number of rendered schedules kept in the LRU cache
+        """
+        self.db = db or open_database()
+        self.cache_size = cache_size
+        self.rendered: "OrderedDict[Tuple, str]" = OrderedDict()
+        self.rosters: Dict[str, Tuple[float, Dict[str, str]]] = {}
+        self.lock = threading.RLock()
+        # bumped by every write, renders started before a write are not cached
+        self.generation = 0
+
+    def roster(self, file: str) -> Dict[str, str]:
+        """
+        Parses a roster csv into a name -> email mapping of its valid rows, reparsing
+        only when the file changes
+        """
+        mtime = os.path.getmtime(file)
+        with self.lock:
+            cached = self.rosters.get(file)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        names_email = validate_roster(csv_parser(file)).students
+        with self.lock:
+            self.rosters[file] = (mtime, names_email)
+        return names_email
+
+    def retrieve(self, key: str, value: str) -> List[dict]:
+        with self.lock:
+            # records are revised in place, callers get a copy to serialize
+            return deepcopy(self.db.retrieve(key, value))
+
+    def serialized(self, key: str, value: str) -> str:
+        """
+        The schedules matching key/value as a JSON array, served from the LRU cache
+        until the next write
+        """
+        cache_key = ("schedules", key, value)
+        with self.lock:
+            if (serialized := self.rendered.get(cache_key)) is None:
+                # serialized under the lock, so no copy of the records is needed
+                serialized = json.dumps(self.db.retrieve(key, value))
+                self.cache(cache_key, serialized)
+            else:
+                self.rendered.move_to_end(cache_key)
+        return serialized
+
+    def cache(self, cache_key: Tuple, rendered: str):
+        with self.lock:
+            self.rendered[cache_key] = rendered
+            if len(self.rendered) > self.cache_size:
+                self.rendered.popitem(last=False)
+
+    def count(self) -> int:
+        with self.lock:
+            return len(self.db.db)
+
+    def save(self, data: dict) -> str:
+        with self.lock:
+            record_id = self.db.save(data)
+            self.generation += 1
+            self.rendered.clear()
+        return record_id
+
+    def delete(self, key: str, value: str) -> List[dict]:
+        with self.lock:
+            deleted = self.db.delete(key, value)
+            if deleted:
+                self.generation += 1
+                self.rendered.clear()
+        return deleted
+
+    def sessions(self, params: Dict[str, str]) -> List[dict]:
+        with self.lock:
+            return self.db.sessions(
+                params["start"],
+                params["end"],
+                params.get("day"),
+                params.get("mode") == "within",
+            )
+
+    def schedule(self, params: Dict[str, Any]) -> dict:
+        """
+        Generates a schedule from a roster file, saving it when params["save"] is set.
+        Accepts the same fields as the schedule sub-command (file, start_time, end_time, tps, npsg, ...)
+        """
+        students = list(self.roster(params["file"]))
+        full_schedule = Scheduler(
+            params["start_time"],
+            params["end_time"],
+            params["tps"],
+            students,
+            params.get("npsg"),
+        ).generate_schedules()
+        data = {"schedule": full_schedule}
+        data.update({k: v for k, v in params.items() if k != "save"})
+        if params.get("save"):
+            with self.lock:
+                self.save(data)
+                return deepcopy(data)
+        return data
+
+    def render(
+        self,
+        key: str,
+        value: str,
+        fmt: str = "text",
+        session_number: Optional[str] = None,
+        group: Optional[str] = None,
+    ) -> str:
+        """
+        Renders the schedules matching key/value, serving repeated requests from the LRU cache
+        """
+        cache_key = (key, value, fmt, session_number, group)
+        with self.lock:
+            if (rendered := self.rendered.get(cache_key)) is not None:
+                self.rendered.move_to_end(cache_key)
+                return rendered
+            generation = self.generation
+            data = deepcopy(self.db.retrieve(key, value))
+        out = io.StringIO()
+        SchedulerFormatter(data, out, fmt, session_number, group).format()
+        rendered = out.getvalue()
+        with self.lock:
+            if generation != self.generation:
+                # the database changed while rendering, do not cache a stale copy
+                return rendered
+            self.cache(cache_key, rendered)
+        return rendered
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON over HTTP front end of a ScheduleService
+
+    GET    /health
+    GET    /schedules?key=id&value=1
+    POST   /schedules                      body: schedule record
+    DELETE /schedules?key=id&value=1
+    POST   /schedule                       body: schedule sub-command fields
+    GET    /render?key=id&value=1&format=text&slot=0&group=1
+    GET    /sessions?start=12:00:00&end=15:00:00&day=monday&mode=within|overlaps
+    """
+
+    service: ScheduleService = None
+    # keep connections open between requests from the same client
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, avoid delayed ack stalls
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, status: int, body: Any, content_type: str = "application/json"):
+        if content_type == "application/json":
+            body = json.dumps(body)
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def query(self) -> Tuple[str, Dict[str, str]]:
+        url = urlparse(self.path)
+        return url.path, {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+    def body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        data = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(data, dict):
+            raise TypeError("request body must be a JSON object")
+        return data
+
+    def handle_request(self, method: str):
+        route, query = self.query()
+        try:
+            if method == "GET" and route == "/health":
+                self.send(200, {"status": "ok", "schedules": self.service.count()})
+            elif method == "GET" and route == "/schedules":
+                serialized = self.service.serialized(query["key"], query["value"])
+                self.send(200, serialized, ScheduleService.CONTENT_TYPES["json"])
+            elif method == "POST" and route == "/schedules":
+                self.send(201, {"id": self.service.save(self.body())})
+            elif method == "DELETE" and route == "/schedules":
+                deleted = self.service.delete(query["key"], query["value"])
+                self.send(200, {"deleted": len(deleted)})
+            elif method == "POST" and route == "/schedule":
+                self.send(201, self.service.schedule(self.body()))
+            elif method == "GET" and route == "/sessions":
+                self.send(200, self.service.sessions(query))
+            elif method == "GET" and route == "/render":
+                fmt = query.get("format", "text")
+                rendered = self.service.render(
+                    query["key"],
+                    query["value"],
+                    fmt,
+                    query.get("slot"),
+                    query.get("group"),
+                )
+                self.send(200, rendered, ScheduleService.CONTENT_TYPES[fmt])
+            else:
+                self.send(404, {"error": f"no route for {method} {route}"})
+        except KeyError as e:
+            self.send(400, {"error": f"missing parameter {e}"})
+        except (TypeError, ValueError, FileNotFoundError) as e:
+            self.send(400, {"error": str(e)})
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def do_DELETE(self):
+        self.handle_request("DELETE")
+
+
+def create_server(
+    service: ScheduleService, host: str = "127.0.0.1", port: int = 8000
+) -> ThreadingHTTPServer:
+    handler = type("Handler", (ServiceRequestHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
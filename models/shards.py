@@ -0,0 +1,255 @@
+"""
+Schedule archive partitioned by session and semester.
+
+With DB_LAYOUT=sharded (see models.open_database), DB_NAME is a directory holding
+one json file per session/semester and a manifest.json that lists the shards, the
+session and semester of each and the ids stored in it. Lookups by id, session or
+semester only open the shards that can hold a match, and old terms are expired by
+dropping whole shards instead of rewriting the archive.
+"""
+
+from os import getenv, path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import json
+import os
+import re
+
+from models import Database
+
+MANIFEST = "manifest.json"
+
+
+def session_order(session: Optional[str]) -> Tuple[Tuple[int, ...], str]:
+    """
+    Sort key of a school session, "2021/2022" sorts by its years
+    """
+    if session is None:
+        return (), ""
+    return tuple(int(year) for year in re.findall(r"\d+", session)), session
+
+
+class ShardedDatabase(Database):
+    """
+    Database keeping every session/semester in its own file, loaded on first use
+    """
+
+    @classmethod
+    def locate(cls) -> Tuple[str, str]:
+        directory = getenv("DB_NAME")
+        return path.join(directory, MANIFEST), path.join(directory, "stats")
+
+    def open(self):
+        self.directory = path.dirname(self.db_name)
+        # shard key -> records, for the shards read so far
+        self.shards: Dict[str, List[dict]] = {}
+        # shards changed since the last write
+        self.dirty: Set[str] = set()
+        if path.exists(self.db_name):
+            with open(self.db_name) as fd:
+                self.manifest: Dict[str, Dict[str, Any]] = json.load(fd)["shards"]
+        else:
+            self.manifest = {}
+            self.write()
+        self.ids = {
+            record_id: key
+            for key, entry in self.manifest.items()
+            for record_id in entry["ids"]
+        }
+
+    @staticmethod
+    def shard_key(data: dict) -> str:
+        return json.dumps([data.get("session"), data.get("semester")])
+
+    @property
+    def db(self) -> List[dict]:
+        return [data for key in list(self.manifest) for data in self.shard(key)]
+
+    def shard(self, key: str) -> List[dict]:
+        if key not in self.shards:
+            if key in self.manifest:
+                with open(path.join(self.directory, self.manifest[key]["file"])) as fd:
+                    self.shards[key] = json.load(fd)
+            else:
+                self.shards[key] = []
+        return self.shards[key]
+
+    def candidates(self, key, value) -> Iterable[str]:
+        """
+        Keys of the shards that can hold a record whose key equals value
+        """
+        if key == "id":
+            return [self.ids[value]] if value in self.ids else []
+        if key in ("session", "semester"):
+            return [k for k, entry in self.manifest.items() if entry[key] == value]
+        return list(self.manifest)
+
+    def append(self, data: dict):
+        key = self.shard_key(data)
+        self.shard(key).append(data)
+        self.dirty.add(key)
+        for index_key, index in self.indexes.items():
+            self.add_to_index(index, index_key, data)
+        self.intervals = None
+
+    def save_many(self, records: List[dict]) -> List[str]:
+        ids = super().save_many(records)
+        # written shards are read again when needed, so bulk loads stay bounded
+        self.shards.clear()
+        self.reset_indexes()
+        return ids
+
+    def iter_records(self) -> Iterator[dict]:
+        """
+        Yields every record one shard at a time, unloading the shards it had to read
+        """
+        for key in list(self.manifest):
+            loaded = key in self.shards
+            yield from self.shard(key)
+            if not loaded and key not in self.dirty:
+                self.shards.pop(key, None)
+
+    def revise(self, record: dict, data: dict):
+        # the record is moved to its new shard on write if its session or semester changed
+        self.dirty.add(self.ids[record["id"]])
+        return super().revise(record, data)
+
+    def retrieve(self, key, value):
+        if key not in ("id", "session", "semester"):
+            return super().retrieve(key, value)
+        return [
+            data
+            for shard_key in self.candidates(key, value)
+            for data in self.shard(shard_key)
+            if data.get(key) == value
+        ]
+
+    def delete(self, key, value):
+        stats = self.stats
+        deleted = []
+        for shard_key in self.candidates(key, value):
+            records = self.shard(shard_key)
+            kept = [data for data in records if data.get(key) != value]
+            if len(kept) != len(records):
+                deleted.extend(data for data in records if data.get(key) == value)
+                self.shards[shard_key] = kept
+                self.dirty.add(shard_key)
+        if deleted:
+            self.reset_indexes()
+            for data in deleted:
+                stats.remove(data)
+        self.write()
+        self.bytes_written += stats.write(self.db_name)
+        return deleted
+
+    def expire(self, keep: Optional[int] = None) -> List[str]:
+        """
+        Drops every shard outside the newest keep sessions. Only the manifest is
+        rewritten, the expired shards are removed without being read
+        :param keep: number of sessions retained, RETENTION_SESSIONS if not given
+        :return: keys of the expired shards
+        """
+        if keep is None:
+            if not getenv("RETENTION_SESSIONS"):
+                raise ValueError(
+                    "give the number of sessions to keep or set RETENTION_SESSIONS"
+                )
+            keep = int(getenv("RETENTION_SESSIONS"))
+        if keep <= 0:
+            raise ValueError("the number of sessions to keep must be at least 1")
+        sessions = sorted(
+            {entry["session"] for entry in self.manifest.values()},
+            key=session_order,
+            reverse=True,
+        )
+        retained = set(sessions[:keep])
+        expired = [
+            key
+            for key, entry in self.manifest.items()
+            if entry["session"] not in retained
+        ]
+        for key in expired:
+            entry = self.manifest.pop(key)
+            os.remove(path.join(self.directory, entry["file"]))
+            self.shards.pop(key, None)
+            self.dirty.discard(key)
+            for record_id in entry["ids"]:
+                self.ids.pop(record_id, None)
+        if expired:
+            self.reset_indexes()
+            # the expired records are not read to be subtracted, the aggregates are
+            # rebuilt from the retained shards when next needed
+            self.stats = None
+            self.bytes_written = 0
+            self.write_manifest()
+        return expired
+
+    def relocate(self):
+        """
+        Moves revised records whose session or semester changed to their new shard
+        """
+        for key in list(self.dirty):
+            for data in list(self.shards[key]):
+                if (new_key := self.shard_key(data)) != key:
+                    self.shards[key].remove(data)
+                    self.shard(new_key).append(data)
+                    self.dirty.add(new_key)
+
+    def file_name(self, key: str) -> str:
+        session, semester = json.loads(key)
+        name = re.sub(r"[^\w.-]+", "_", f"{session}-{semester}")
+        used = {entry["file"] for entry in self.manifest.values()}
+        file, n = f"{name}.json", 1
+        while file in used:
+            file, n = f"{name}-{n}.json", n + 1
+        return file
+
+    def write(self, mode="w"):
+        os.makedirs(self.directory, exist_ok=True)
+        self.bytes_written = 0
+        self.relocate()
+        for key in self.dirty:
+            for record_id in self.manifest.get(key, {}).get("ids", []):
+                self.ids.pop(record_id, None)
+        for key in self.dirty:
+            records = self.shards[key]
+            entry = self.manifest.get(key)
+            if not records:
+                if entry:
+                    os.remove(path.join(self.directory, entry["file"]))
+                    del self.manifest[key]
+                continue
+            if entry is None:
+                session, semester = json.loads(key)
+                entry = {
+                    "file": self.file_name(key),
+                    "session": session,
+                    "semester": semester,
+                }
+                self.manifest[key] = entry
+            entry["ids"] = [data.get("id") for data in records]
+            for record_id in entry["ids"]:
+                self.ids[record_id] = key
+            file = path.join(self.directory, entry["file"])
+            with open(file, "w") as fd:
+                json.dump(records, fd)
+            self.bytes_written += path.getsize(file)
+        self.dirty.clear()
+        self.write_manifest()
+
+    def write_manifest(self):
+        with open(self.db_name, "w") as fd:
+            json.dump({"shards": self.manifest}, fd)
+        self.bytes_written += path.getsize(self.db_name)
+
+    def migrate(self, source: str) -> int:
+        """
+        Splits a single file database into the shards, keeping the record ids
+        :return: number of records moved
+        """
+        with open(source) as fd:
+            records = json.load(fd)
+        for data in records:
+            self.append(data)
+        self.write()
+        self.stats = None
+        return len(records)
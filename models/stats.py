@@ -0,0 +1,252 @@
+from itertools import combinations
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import json
+import os
+
+DIMENSIONS = ("course", "semester", "session", "day", "slot")
+COUNTERS = ("schedules", "sessions", "groups", "students")
+# slot has close to one value per session, grouped with more than one other
+# dimension it is counted from the schedules when queried instead of being kept
+MAX_SLOT_DIMENSIONS = 2
+# version of the files in the statistics directory, older ones are rebuilt
+FORMAT = 2
+
+
+def materialized(group_by: Iterable[str]) -> bool:
+    """
+    Checks that the aggregates grouped by these dimensions are kept
+    """
+    group_by = set(group_by)
+    return "slot" not in group_by or len(group_by) <= MAX_SLOT_DIMENSIONS
+
+
+def group_bys() -> List[Tuple[str, ...]]:
+    """
+    Every kept combination of DIMENSIONS (including none), in DIMENSIONS order
+    """
+    return [
+        group_by
+        for size in range(len(DIMENSIONS) + 1)
+        for group_by in combinations(DIMENSIONS, size)
+        if materialized(group_by)
+    ]
+
+
+class ScheduleStats:
+    """
+    Aggregates of the schedule archive for the combinations of course, semester,
+    session, day and slot. The aggregates are updated as schedules are added and
+    removed and each combination is kept in its own file, so a query only reads the
+    rows it returns instead of the archive. The files are logs of changed rows, a
+    write appends the rows it changed and the log is compacted once most of its lines
+    are superseded.
+    """
+
+    def __init__(self, directory: str):
+        """
+        :param directory: directory the aggregates are persisted to
+        """
+        self.directory = directory
+        self.records = 0
+        # ("course", "semester") -> '["MCT543", "first"]' -> counters
+        self.cubes: Dict[Tuple[str, ...], Dict[str, Dict[str, int]]] = {}
+        # lines in each cube file, cubes without an entry are rewritten by write
+        self.lines: Dict[Tuple[str, ...], int] = {}
+        # rows changed since the last write
+        self.changed: Dict[Tuple[str, ...], Set[str]] = {}
+
+    def path(self, group_by: Tuple[str, ...]) -> str:
+        return os.path.join(self.directory, f"{'+'.join(group_by) or 'all'}.jsonl")
+
+    @staticmethod
+    def signature(db_name: str) -> List[int]:
+        stat = os.stat(db_name)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def fresh(self, db_name: str) -> bool:
+        """
+        Checks that the saved aggregates were written for the current database file
+        """
+        try:
+            with open(os.path.join(self.directory, "manifest.json")) as fd:
+                manifest = json.load(fd)
+        except FileNotFoundError:
+            return False
+        self.records = manifest["records"]
+        return manifest.get("format") == FORMAT and manifest["db"] == self.signature(
+            db_name
+        )
+
+    def cube(self, group_by: Tuple[str, ...]) -> Dict[str, Dict[str, int]]:
+        if group_by not in self.cubes:
+            cube, lines = {}, 0
+            try:
+                with open(self.path(group_by)) as fd:
+                    for line in fd:
+                        key, counters = json.loads(line)
+                        if counters is None:
+                            cube.pop(key, None)
+                        else:
+                            cube[key] = counters
+                        lines += 1
+            except FileNotFoundError:
+                pass
+            self.cubes[group_by] = cube
+            self.lines[group_by] = lines
+        return self.cubes[group_by]
+
+    def load_all(self):
+        for group_by in group_bys():
+            self.cube(group_by)
+
+    def rebuild(self, db: List[dict]):
+        self.records = 0
+        self.cubes = {group_by: {} for group_by in group_bys()}
+        self.lines = {}
+        self.changed = {}
+        for data in db:
+            self.add(data)
+
+    def write(self, db_name: str) -> int:
+        """
+        Persists the changed aggregates, db_name is the database file they were
+        computed from
+        :return: number of bytes written
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        written = 0
+        for group_by, cube in self.cubes.items():
+            keys = self.changed.pop(group_by, set())
+            lines = self.lines.get(group_by)
+            if lines is not None and not keys:
+                continue
+            file = self.path(group_by)
+            # rewritten once most of the log is superseded, appended to otherwise
+            if lines is None or lines + len(keys) > max(2 * len(cube), 1024):
+                with open(file, "w") as fd:
+                    for key, counters in cube.items():
+                        fd.write(json.dumps([key, counters]) + "\n")
+                self.lines[group_by] = len(cube)
+                written += os.path.getsize(file)
+            else:
+                size = os.path.getsize(file)
+                with open(file, "a") as fd:
+                    for key in sorted(keys):
+                        fd.write(json.dumps([key, cube.get(key)]) + "\n")
+                self.lines[group_by] = lines + len(keys)
+                written += os.path.getsize(file) - size
+        manifest = os.path.join(self.directory, "manifest.json")
+        with open(manifest, "w") as fd:
+            json.dump(
+                {
+                    "format": FORMAT,
+                    "records": self.records,
+                    "db": self.signature(db_name),
+                },
+                fd,
+            )
+        return written + os.path.getsize(manifest)
+
+    @staticmethod
+    def contributions(data: dict) -> Iterable[Tuple[Dict[str, Any], Dict[str, int]]]:
+        """
+        Yields the dimension values and counters of every session of a schedule
+        """
+        for sh in data.get("schedule") or []:
+            groups = sh.get("groups") or []
+            if isinstance(groups, dict):
+                no_of_groups = len(groups)
+                students = sum(len(names) for names in groups.values())
+            else:
+                no_of_groups = 1 if groups else 0
+                students = len(groups)
+            values = {key: data.get(key) for key in DIMENSIONS[:-1]}
+            values["slot"] = f"{sh.get('start_time')}-{sh.get('end_time')}"
+            yield values, {"sessions": 1, "groups": no_of_groups, "students": students}
+
+    @staticmethod
+    def tally(
+        cube: Dict[str, Dict[str, int]],
+        group_by: Tuple[str, ...],
+        data: dict,
+        sessions: List[Tuple[Dict[str, Any], Dict[str, int]]],
+        sign: int,
+    ) -> Set[str]:
+        """
+        Adds (sign 1) or subtracts (sign -1) the sessions of a schedule to a cube
+        :return: keys of the changed rows
+        """
+        touched = set()
+        for values, counters in sessions:
+            key = json.dumps([values[dimension] for dimension in group_by])
+            row = cube.setdefault(key, dict.fromkeys(COUNTERS, 0))
+            for name, value in counters.items():
+                row[name] += sign * value
+            touched.add(key)
+        if not sessions and "slot" not in group_by:
+            key = json.dumps([data.get(dimension) for dimension in group_by])
+            cube.setdefault(key, dict.fromkeys(COUNTERS, 0))
+            touched.add(key)
+        # a schedule is counted once per row it contributes to
+        for key in touched:
+            cube[key]["schedules"] += sign
+            if cube[key]["schedules"] <= 0:
+                del cube[key]
+        return touched
+
+    def update(self, data: dict, sign: int):
+        sessions = list(self.contributions(data))
+        self.load_all()
+        for group_by in group_bys():
+            touched = self.tally(self.cubes[group_by], group_by, data, sessions, sign)
+            self.changed.setdefault(group_by, set()).update(touched)
+        self.records += sign
+
+    def add(self, data: dict):
+        self.update(data, 1)
+
+    def remove(self, data: dict):
+        self.update(data, -1)
+
+    def query(
+        self, group_by: Iterable[str] = (), records: Optional[Iterable[dict]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        :param group_by: dimensions to group by, any of DIMENSIONS
+        :param records: (Optional) the schedules, needed for the combinations that
+        are not kept (see materialized)
+        :return: one row per group with its counters, average group size and average
+        number of students per session
+        """
+        group_by = set(group_by)
+        if unknown := group_by.difference(DIMENSIONS):
+            raise ValueError(f"cannot group by {', '.join(sorted(unknown))}")
+        dimensions = tuple(d for d in DIMENSIONS if d in group_by)
+        if materialized(dimensions):
+            cube = self.cube(dimensions)
+        elif records is None:
+            raise ValueError(
+                f"statistics by {', '.join(dimensions)} are not kept, "
+                "they are counted from the schedules"
+            )
+        else:
+            cube = {}
+            for data in records:
+                sessions = list(self.contributions(data))
+                self.tally(cube, dimensions, data, sessions, 1)
+        rows = []
+        for key, counters in sorted(cube.items()):
+            row = dict(zip(dimensions, json.loads(key)))
+            row.update(counters)
+            row["avg_group_size"] = (
+                round(counters["students"] / counters["groups"], 2)
+                if counters["groups"]
+                else 0
+            )
+            row["avg_students_per_session"] = (
+                round(counters["students"] / counters["sessions"], 2)
+                if counters["sessions"]
+                else 0
+            )
+            rows.append(row)
+        return rows
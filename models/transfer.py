@@ -0,0 +1,164 @@
+"""
+Bulk export and import of saved schedules.
+
+Records are streamed one at a time as NDJSON (one json object per line) or CSV (one
+row per schedule, the schedule and its revisions json encoded, empty cells left out
+when read back), so an archive of any size can be moved with bounded memory.
+"""
+
+from typing import Dict, Iterable, Iterator, Optional, Set, TextIO
+import csv
+import hashlib
+import json
+import sys
+
+from models import Database
+
+CSV_FIELDS = [
+    "id",
+    "course",
+    "session",
+    "semester",
+    "day",
+    "date",
+    "start_time",
+    "end_time",
+    "tps",
+    "npsg",
+    "subject",
+    "file",
+    "version",
+    "schedule",
+    "revisions",
+    # any other field, json encoded
+    "extra",
+]
+JSON_FIELDS = ("schedule", "revisions", "extra")
+
+
+def file_format(file: str) -> str:
+    return "csv" if file.lower().endswith(".csv") else "jsonl"
+
+
+def content_hash(data: dict) -> str:
+    """
+    Hash of a record ignoring its id and empty fields, equal for the same schedule
+    saved under different ids or read back from csv
+    """
+    content = {
+        key: value for key, value in data.items() if key != "id" and value is not None
+    }
+    encoded = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+
+def to_row(data: dict) -> Dict[str, str]:
+    row = {}
+    extra = {key: value for key, value in data.items() if key not in CSV_FIELDS}
+    for field in CSV_FIELDS:
+        value = extra if field == "extra" else data.get(field)
+        if field in JSON_FIELDS:
+            row[field] = json.dumps(value) if value else ""
+        else:
+            row[field] = "" if value is None else str(value)
+    return row
+
+
+def from_row(row: Dict[str, str]) -> dict:
+    data = {}
+    for field in CSV_FIELDS:
+        value = row.get(field) or None
+        if value is not None and field in JSON_FIELDS:
+            value = json.loads(value)
+        elif value is not None and field == "version":
+            value = int(value)
+        if field == "extra":
+            data.update(value or {})
+        elif value is not None:
+            data[field] = value
+    return data
+
+
+def write_records(records: Iterable[dict], out: TextIO, fmt: str = "jsonl") -> int:
+    """
+    Streams records to out
+    :param fmt: "jsonl" or "csv"
+    :return: number of records written
+    """
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(out, CSV_FIELDS)
+        writer.writeheader()
+        for count, data in enumerate(records, 1):
+            writer.writerow(to_row(data))
+    else:
+        for count, data in enumerate(records, 1):
+            out.write(json.dumps(data))
+            out.write("\n")
+    return count
+
+
+def read_records(fd: TextIO, fmt: str = "jsonl") -> Iterator[dict]:
+    """
+    Lazily reads records written by write_records
+    """
+    if fmt == "csv":
+        # schedules of large classes do not fit the default cell size limit
+        csv.field_size_limit(sys.maxsize)
+        for row in csv.DictReader(fd):
+            yield from_row(row)
+    else:
+        for line in fd:
+            if line.strip():
+                yield json.loads(line)
+
+
+def export_records(db: Database, file: str) -> int:
+    """
+    Streams every saved schedule to file, "-" for stdout in NDJSON
+    :return: number of schedules exported
+    """
+    if file == "-":
+        return write_records(db.iter_records(), sys.stdout)
+    with open(file, "w", newline="", buffering=1024 * 1024) as out:
+        return write_records(db.iter_records(), out, file_format(file))
+
+
+def import_records(
+    db: Database, file: str, batch_size: Optional[int] = 10000
+) -> Dict[str, int]:
+    """
+    Streams schedules from an NDJSON or CSV export into the database.
+    Every imported schedule gets a new id from CURRENT_DB_ID, schedules already in
+    the database (or earlier in the file) are skipped. Records are saved batch_size
+    at a time, or all at once at the end if batch_size is None
+    :param file: path of the export, "-" for NDJSON on stdin
+    :return: {"imported": n, "duplicates": n}
+    """
+    seen: Set[str] = {content_hash(data) for data in db.iter_records()}
+    counts = {"imported": 0, "duplicates": 0}
+    batch = []
+
+    def flush():
+        db.save_many(batch)
+        counts["imported"] += len(batch)
+        batch.clear()
+
+    fd = sys.stdin if file == "-" else open(file, newline="")
+    try:
+        for data in read_records(fd, "jsonl" if file == "-" else file_format(file)):
+            digest = content_hash(data)
+            if digest in seen:
+                counts["duplicates"] += 1
+                continue
+            seen.add(digest)
+            data["id"] = None
+            batch.append(data)
+            if batch_size and len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        if fd is not sys.stdin:
+            fd.close()
+    return counts
@@ -0,0 +1,224 @@
+"""
+Schedule revisions.
+
+A saved record always holds its latest schedule and fields. Every later revision of
+it adds an entry to record["revisions"] holding only the sessions, groups and top
+level fields that changed, recorded as the changes that turn that version back into
+its parent. Older versions are rebuilt by undoing revisions from the latest one,
+sharing every unchanged session and group with it.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# marks a session or group that did not exist in the other version
+MISSING = None
+# record keys that are not versioned as top level fields
+RESERVED_FIELDS = ("schedule", "version", "revisions")
+
+
+def session_key(sh: Dict) -> str:
+    return str(sh.get("session_number"))
+
+
+def by_session(schedule: List[Dict]) -> Dict[str, Dict]:
+    return {session_key(sh): sh for sh in schedule}
+
+
+def session_delta(old: Optional[Dict], new: Optional[Dict]) -> Optional[Dict]:
+    """
+    Changes that turn session new into session old, only listing the groups that
+    differ when both are grouped
+    """
+    if old is None:
+        return MISSING
+    if new is None or not (
+        isinstance(old.get("groups"), dict) and isinstance(new.get("groups"), dict)
+    ):
+        return old
+    delta = {key: value for key, value in old.items() if key != "groups"}
+    delta["groups"] = {
+        group_no: old["groups"].get(group_no, MISSING)
+        for group_no in set(old["groups"]) | set(new["groups"])
+        if old["groups"].get(group_no) != new["groups"].get(group_no)
+    }
+    delta["partial"] = True
+    return delta
+
+
+def schedule_delta(old: List[Dict], new: List[Dict]) -> Dict[str, Optional[Dict]]:
+    """
+    Changes, per session number, that turn schedule new back into schedule old
+    """
+    old_sessions, new_sessions = by_session(old), by_session(new)
+    return {
+        key: session_delta(old_sessions.get(key), new_sessions.get(key))
+        for key in list(old_sessions)
+        + [k for k in new_sessions if k not in old_sessions]
+        if old_sessions.get(key) != new_sessions.get(key)
+    }
+
+
+def apply_session(sh: Optional[Dict], delta: Optional[Dict]) -> Optional[Dict]:
+    if delta is MISSING:
+        return MISSING
+    if not delta.get("partial"):
+        return delta
+    groups = dict(sh["groups"])
+    for group_no, names in delta["groups"].items():
+        if names is MISSING:
+            groups.pop(group_no, None)
+        else:
+            groups[group_no] = names
+    session = {key: value for key, value in delta.items() if key != "partial"}
+    session["groups"] = dict(
+        sorted(groups.items(), key=lambda item: group_order(item[0]))
+    )
+    return session
+
+
+def group_order(group_no: str) -> Tuple[int, Any]:
+    number = group_no.rsplit(" ", 1)[-1]
+    return (0, int(number)) if number.isdigit() else (1, group_no)
+
+
+def revisions_between(record: Dict, low: int, high: int) -> List[Dict]:
+    """
+    Revisions needed to go from version high down to version low, newest first
+    """
+    return [
+        revision
+        for revision in reversed(record.get("revisions", []))
+        if low < revision["version"] <= high
+    ]
+
+
+def latest_version(record: Dict) -> int:
+    return record.get("version", 1)
+
+
+def check_version(record: Dict, version: int):
+    if not 1 <= version <= latest_version(record):
+        raise ValueError(
+            f"version must be between 1 and {latest_version(record)}, got {version}"
+        )
+
+
+def schedule_at(record: Dict, version: int) -> List[Dict]:
+    """
+    Rebuilds the schedule of a record as it was at version
+    """
+    check_version(record, version)
+    sessions = by_session(record["schedule"])
+    for revision in revisions_between(record, version, latest_version(record)):
+        for key, delta in revision["changes"].items():
+            sessions[key] = apply_session(sessions.get(key), delta)
+    schedule = [sh for sh in sessions.values() if sh is not MISSING]
+    return sorted(schedule, key=lambda sh: sh["session_number"])
+
+
+def sessions_at(record: Dict, version: int, keys: Iterable[str]) -> Dict[str, Dict]:
+    """
+    Rebuilds only the given sessions of a record as they were at version
+    """
+    latest = record["schedule"]
+    sessions = {}
+    for key in keys:
+        # generated schedules are ordered by session number, fall back to a search
+        index = int(key) if key.lstrip("-").isdigit() else -1
+        if 0 <= index < len(latest) and session_key(latest[index]) == key:
+            sessions[key] = latest[index]
+        else:
+            sessions[key] = next((sh for sh in latest if session_key(sh) == key), None)
+    for revision in revisions_between(record, version, latest_version(record)):
+        for key in sessions:
+            if key in revision["changes"]:
+                sessions[key] = apply_session(sessions[key], revision["changes"][key])
+    return sessions
+
+
+def placements(sessions: Dict[str, Optional[Dict]]) -> Dict[str, Tuple[Any, Any]]:
+    """
+    Maps every student in the sessions to their (session number, group)
+    """
+    placed = {}
+    for sh in sessions.values():
+        if sh is MISSING:
+            continue
+        if isinstance(sh["groups"], dict):
+            for group_no, names in sh["groups"].items():
+                for name in names:
+                    placed[name] = (sh["session_number"], group_no)
+        else:
+            for name in sh["groups"]:
+                placed[name] = (sh["session_number"], None)
+    return placed
+
+
+def diff(record: Dict, old: int, new: int) -> List[Dict[str, Any]]:
+    """
+    Students whose session or group differs between two versions of a record.
+    Only the sessions changed by the revisions in between are looked at
+    :return: list of {"name", "from": [session, group] | None, "to": [session, group] | None}
+    """
+    check_version(record, old)
+    check_version(record, new)
+    low, high = sorted((old, new))
+    changed: Set[str] = set()
+    for revision in revisions_between(record, low, high):
+        changed.update(revision["changes"])
+    before = placements(sessions_at(record, old, changed))
+    after = placements(sessions_at(record, new, changed))
+    moves = []
+    for name in sorted(set(before) | set(after)):
+        if before.get(name) != after.get(name):
+            moves.append(
+                {
+                    "name": name,
+                    "from": list(before[name]) if name in before else None,
+                    "to": list(after[name]) if name in after else None,
+                }
+            )
+    return moves
+
+
+def fields_at(record: Dict, version: int) -> Dict:
+    """
+    Rebuilds the top level fields of a record as they were at version
+    """
+    check_version(record, version)
+    fields = {key: value for key, value in record.items() if key not in RESERVED_FIELDS}
+    for revision in revisions_between(record, version, latest_version(record)):
+        fields.update(revision.get("fields", {}))
+        for key in revision.get("added", []):
+            fields.pop(key, None)
+    return fields
+
+
+def add_revision(
+    record: Dict, schedule: List[Dict], fields: Optional[Dict] = None
+) -> int:
+    """
+    Makes schedule and fields the latest version of record, keeping only what changed
+    :param fields: (Optional) top level fields to update, schedule/version/revisions
+    are ignored
+    :return: the new version number, unchanged if nothing changed
+    """
+    fields = {
+        key: value
+        for key, value in (fields or {}).items()
+        if key not in RESERVED_FIELDS and (key not in record or record[key] != value)
+    }
+    changes = schedule_delta(record["schedule"], schedule)
+    if not changes and not fields:
+        return latest_version(record)
+    version = latest_version(record) + 1
+    revision: Dict[str, Any] = {"version": version, "changes": changes}
+    if old := {key: record[key] for key in fields if key in record}:
+        revision["fields"] = old
+    if added := [key for key in fields if key not in record]:
+        revision["added"] = added
+    record.setdefault("revisions", []).append(revision)
+    record.update(fields)
+    record["version"] = version
+    record["schedule"] = schedule
+    return version
@@ -0,0 +1,70 @@
+"""
+Fixtures shared by the tests
+"""
+
+from typing import Dict, List, Optional, Union
+from unittest import mock
+import os
+import tempfile
+import unittest
+
+
+def session(
+    number: int, start_time: str, end_time: str, groups: Union[dict, list]
+) -> dict:
+    return {
+        "session_number": number,
+        "start_time": start_time,
+        "end_time": end_time,
+        "groups": groups,
+    }
+
+
+def schedule() -> List[dict]:
+    return [
+        session(
+            0,
+            "12:00:00",
+            "13:00:00",
+            {"group 0": ["Adam Adams", "Taylor Wall"], "group 1": ["Jason Torres"]},
+        ),
+        session(1, "13:00:00", "14:00:00", {"group 0": ["Anna Fox", "Gabriel Lee"]}),
+    ]
+
+
+def record(record_id: Optional[str] = "1", **fields) -> dict:
+    """
+    A saved schedule, two sessions of MCT543 in the first semester of 2023
+    :param fields: fields added to or replacing the defaults
+    """
+    data = {
+        "id": record_id,
+        "course": "MCT543",
+        "session": "2023",
+        "semester": "first",
+        "schedule": schedule(),
+    }
+    data.update(fields)
+    return data
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    Points DB_NAME at a temporary directory for every test, the environment is
+    restored and the directory removed afterwards
+    """
+
+    # DB_NAME relative to the temporary directory
+    db_file = "db.json"
+    # variables set besides DB_NAME and DB_LAYOUT (the single file layout)
+    environ: Dict[str, str] = {}
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.db_name = os.path.join(self.tmpdir.name, self.db_file)
+        environ = mock.patch.dict(
+            os.environ, {"DB_NAME": self.db_name, "DB_LAYOUT": "", **self.environ}
+        )
+        environ.start()
+        self.addCleanup(environ.stop)
@@ -0,0 +1,45 @@
+from models import EmailSender, EmailStudents, MemoryTransport
+import unittest
+
+
+class TestEmailStudents(unittest.TestCase):
+    def test_send_email_with_memory_transport(self):
+        data = {
+            "subject": "LAB SCHEDULE",
+            "course": "MCT543",
+            "schedule": [
+                {
+                    "session_number": 0,
+                    "start_time": "12:00:00",
+                    "end_time": "13:00:00",
+                    "groups": {"group 0": ["Adam Adams", "Taylor Wall"]},
+                },
+                {
+                    "session_number": 1,
+                    "start_time": "13:00:00",
+                    "end_time": "14:00:00",
+                    "groups": ["Anna Fox"],
+                },
+            ],
+        }
+        names_email = {
+            "Adam Adams": "adam@example.com",
+            "Taylor Wall": "taylor@example.com",
+            "Anna Fox": "anna@example.com",
+        }
+        transport = MemoryTransport()
+        sender = EmailSender(
+            "lab@example.com", "secret", transport=transport, verbose=False
+        )
+        EmailStudents(names_email, data, sender).send_email()
+
+        self.assertEqual(
+            [message["to"] for message in transport.outbox],
+            ["adam@example.com", "taylor@example.com", "anna@example.com"],
+        )
+        self.assertIn("Hi Anna Fox", transport.outbox[2]["message"])
+        self.assertIn("SESSION_NUMBER: 1", transport.outbox[2]["message"])
+
+
+if __name__ == "__main__":
+    unittest.main()
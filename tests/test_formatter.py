@@ -0,0 +1,70 @@
+from models.formatter import SchedulerFormatter, BufferedWriter
+from tests.helpers import record
+import csv
+import io
+import json
+import unittest
+
+
+def sample_data():
+    return [record(day="Monday", start_time="12:00:00", end_time="14:00:00")]
+
+
+class TestSchedulerFormatter(unittest.TestCase):
+    def render(self, **kwargs):
+        out = io.StringIO()
+        SchedulerFormatter(sample_data(), out=out, **kwargs).format()
+        return out.getvalue()
+
+    def test_text_format(self):
+        text = self.render()
+        self.assertIn("SESSION NUMBER: 1", text)
+        self.assertIn("SESSION: 2023", text)
+        self.assertIn("1 ADAM ADAMS", text)
+
+    def test_csv_format(self):
+        rows = list(csv.DictReader(io.StringIO(self.render(fmt="csv"))))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]["name"], "Adam Adams")
+        self.assertEqual(rows[0]["group"], "group 0")
+
+    def test_jsonl_format(self):
+        rows = [json.loads(line) for line in self.render(fmt="jsonl").splitlines()]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[-1]["session_number"], 1)
+
+    def test_html_format_escapes_names(self):
+        data = sample_data()
+        data[0]["schedule"][0]["groups"]["group 0"].append("<b>")
+        out = io.StringIO()
+        SchedulerFormatter(data, out=out, fmt="html").format()
+        self.assertIn("&lt;b&gt;", out.getvalue())
+
+    def test_session_and_group_filters(self):
+        rows = [
+            json.loads(line)
+            for line in self.render(
+                fmt="jsonl", session_number="0", group="1"
+            ).splitlines()
+        ]
+        self.assertEqual([row["name"] for row in rows], ["Jason Torres"])
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            SchedulerFormatter(sample_data(), fmt="xml")
+
+    def test_data_must_be_list(self):
+        with self.assertRaises(TypeError):
+            SchedulerFormatter({}, out=io.StringIO()).format()
+
+    def test_buffered_writer_writes_in_chunks(self):
+        out = io.StringIO()
+        writer = BufferedWriter(out, buffer_size=10)
+        writer.write("abcd")
+        self.assertEqual(out.getvalue(), "")
+        writer.write("efghijk")
+        self.assertEqual(out.getvalue(), "abcdefghijk")
+
+
+if __name__ == "__main__":
+    unittest.main()
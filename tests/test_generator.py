@@ -0,0 +1,81 @@
+from models import InputParser
+from tests.helpers import DatabaseTestCase
+from util import csv_parser
+from util.generator import generate_roster, write_archive, write_roster
+import json
+import main
+import os
+import tempfile
+import unittest
+
+
+class TestGenerator(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_roster_is_unique(self):
+        rows = list(generate_roster(5000, seed=1))
+        self.assertEqual(len({name for name, _ in rows}), 5000)
+        self.assertEqual(len({email for _, email in rows}), 5000)
+
+    def test_roster_is_reproducible(self):
+        self.assertEqual(
+            list(generate_roster(50, seed=7)), list(generate_roster(50, seed=7))
+        )
+
+    def test_write_roster(self):
+        file = os.path.join(self.tmpdir.name, "roster.csv")
+        write_roster(file, 25, seed=1, chunk_size=10)
+        data = csv_parser(file)
+        self.assertEqual(len(data), 25)
+        self.assertEqual(set(data[0]), {"Name", "Email"})
+
+    def test_write_archive(self):
+        file = os.path.join(self.tmpdir.name, "db.json")
+        write_archive(file, 3, 10, seed=1)
+        with open(file) as fd:
+            archive = json.load(fd)
+        self.assertEqual([record["id"] for record in archive], ["1", "2", "3"])
+        for record in archive:
+            names = [
+                name
+                for sh in record["schedule"]
+                for names in sh["groups"].values()
+                for name in names
+            ]
+            self.assertEqual(len(names), 10)
+        write_archive(file, 2, 10, seed=1, first_id=41)
+        with open(file) as fd:
+            self.assertEqual([record["id"] for record in json.load(fd)], ["41", "42"])
+
+
+class TestGenerateCommand(DatabaseTestCase):
+    environ = {"CURRENT_DB_ID": "10"}
+
+    def setUp(self) -> None:
+        super().setUp()
+        # reserved ids are written to .env in the working directory
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.tmpdir.name)
+
+    def test_archive_ids_are_reserved(self):
+        file = os.path.join(self.tmpdir.name, "archive.json")
+        parser = InputParser(
+            shfunc=main.scheduler_function,
+            dbfunc=main.database_function,
+            genfunc=main.generator_function,
+        )
+        main.generator_function(
+            parser.parser.parse_args(["generate", "archive", "-n", "3", "-f", file])
+        )
+        with open(file) as fd:
+            ids = [record["id"] for record in json.load(fd)]
+        self.assertEqual(ids, ["11", "12", "13"])
+        self.assertEqual(os.environ["CURRENT_DB_ID"], "13")
+
+
+if __name__ == "__main__":
+    unittest.main()
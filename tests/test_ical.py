@@ -0,0 +1,86 @@
+from datetime import date
+from models import EmailSender, EmailStudents, MemoryTransport
+from models.ical import SessionCalendar, fold, write_feed
+from tests.helpers import record
+import os
+import tempfile
+import unittest
+
+
+class TestSessionCalendar(unittest.TestCase):
+    def test_explicit_date(self):
+        ics = SessionCalendar(record(date="2024-05-13"))
+        event = ics.event(ics.data["schedule"][0], "group 0")
+        self.assertIn("DTSTART:20240513T120000", event)
+        self.assertIn("DTEND:20240513T130000", event)
+        self.assertNotIn("RRULE", event)
+
+    def test_day_of_week_is_weekly(self):
+        # 2024-05-15 is a Wednesday, the next Monday is 2024-05-20
+        ics = SessionCalendar(record(day="Monday"), today=date(2024, 5, 15))
+        event = ics.event(ics.data["schedule"][1], "group 0")
+        self.assertIn("DTSTART:20240520T130000", event)
+        self.assertIn("RRULE:FREQ=WEEKLY;COUNT=12", event)
+        ics = SessionCalendar(record(day="Monday", weeks=6))
+        self.assertIn("RRULE:FREQ=WEEKLY;COUNT=6", ics.event(ics.data["schedule"][0]))
+
+    def test_unsaved_schedules_of_different_terms_have_different_uids(self):
+        def uid(**kwargs):
+            ics = SessionCalendar(record(None, date="2024-05-13", **kwargs))
+            event = ics.event(ics.data["schedule"][0], "group 0")
+            return next(line for line in event.split("\r\n") if line.startswith("UID"))
+
+        self.assertEqual(uid(session="2023"), uid(session="2023"))
+        self.assertNotEqual(uid(session="2023"), uid(session="2024"))
+        self.assertNotEqual(uid(semester="first"), uid(semester="second"))
+
+    def test_unknown_date(self):
+        self.assertFalse(SessionCalendar(record()).available)
+
+    def test_attachment_is_built_once_per_group(self):
+        ics = SessionCalendar(record(date="2024-05-13"))
+        sh = ics.data["schedule"][0]
+        self.assertIs(ics.attachment(sh, "group 0"), ics.attachment(sh, "group 0"))
+        self.assertEqual(len(ics.attachments), 1)
+
+    def test_fold(self):
+        line = "SUMMARY:" + "x" * 200
+        folded = fold(line)
+        self.assertTrue(all(len(part) <= 75 for part in folded.split("\r\n")))
+        self.assertEqual(folded.replace("\r\n ", ""), line)
+
+    def test_write_feed(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file = os.path.join(tmpdir, "feed.ics")
+            count = write_feed(
+                [record(date="2024-05-13"), record("2", day="Friday"), record()],
+                file,
+            )
+            with open(file, newline="") as fd:
+                feed = fd.read()
+        self.assertEqual(count, 6)
+        self.assertEqual(feed.count("BEGIN:VEVENT"), 6)
+        self.assertTrue(feed.startswith("BEGIN:VCALENDAR\r\n"))
+
+    def test_email_attachments_are_shared(self):
+        names_email = {
+            "Adam Adams": "adam@example.com",
+            "Taylor Wall": "taylor@example.com",
+            "Anna Fox": "anna@example.com",
+            "Jason Torres": "jason@example.com",
+            "Gabriel Lee": "gabriel@example.com",
+        }
+        transport = MemoryTransport()
+        sender = EmailSender(
+            "lab@example.com", "secret", transport=transport, verbose=False
+        )
+        data = record(date="2024-05-13", subject="LAB SCHEDULE")
+        EmailStudents(names_email, data, sender).send_email()
+
+        self.assertEqual(len(transport.outbox), 5)
+        self.assertTrue(all("text/calendar" in m["message"] for m in transport.outbox))
+        self.assertEqual(len(sender.parts), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+from models import Database, InputParser
+from models.intervals import IntervalTree, SessionIndex, seconds
+from tests.helpers import DatabaseTestCase, record, session
+import main
+import random
+import unittest
+
+
+def sessions(*slots):
+    return [session(i, start, end, ["a", "b"]) for i, (start, end) in enumerate(slots)]
+
+
+RECORDS = [
+    record(
+        "1",
+        day="Monday",
+        schedule=sessions(("9:00:00", "10:00:00"), ("10:00:00", "11:00:00")),
+    ),
+    record(
+        "2",
+        day="Monday",
+        schedule=sessions(("12:00:00", "13:30:00"), ("13:30:00", "15:00:00")),
+    ),
+    record("3", day="Tuesday", schedule=sessions(("12:30:00", "14:00:00"))),
+]
+
+
+class TestIntervalTree(unittest.TestCase):
+    def test_matches_a_linear_scan(self):
+        rng = random.Random(4)
+        intervals = []
+        for i in range(2000):
+            start = rng.randrange(0, 1000)
+            intervals.append((start, start + rng.randrange(1, 60), i))
+        tree = IntervalTree(intervals)
+        for _ in range(200):
+            low = rng.randrange(0, 1000)
+            high = low + rng.randrange(1, 100)
+            expected = {i for s, e, i in intervals if s < high and e > low}
+            self.assertEqual({i for _, _, i in tree.overlapping(low, high)}, expected)
+
+    def test_identical_intervals(self):
+        tree = IntervalTree([(5, 10, i) for i in range(50)])
+        self.assertEqual(len(list(tree.overlapping(9, 20))), 50)
+        self.assertEqual(list(tree.overlapping(10, 20)), [])
+
+
+class TestSessionIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.index = SessionIndex(RECORDS)
+
+    def test_overlaps(self):
+        rows = self.index.query("13:00", "14:00")
+        self.assertEqual(
+            [(row["id"], row["session_number"]) for row in rows],
+            [("2", 0), ("3", 0), ("2", 1)],
+        )
+
+    def test_within_a_day(self):
+        rows = self.index.query("12:00:00", "15:00:00", "monday", contained=True)
+        self.assertEqual([row["start_time"] for row in rows], ["12:00:00", "13:30:00"])
+        self.assertEqual(self.index.query("12:00", "15:00", "friday"), [])
+
+    def test_adjacent_sessions_do_not_overlap(self):
+        rows = self.index.query("10:00", "12:00")
+        self.assertEqual(
+            [(row["id"], row["session_number"]) for row in rows], [("1", 1)]
+        )
+
+    def test_invalid_range(self):
+        self.assertEqual(seconds("1:30"), 5400)
+        with self.assertRaises(ValueError):
+            self.index.query("15:00", "12:00")
+
+
+class TestDatabaseSessions(DatabaseTestCase):
+    def test_index_follows_saves(self):
+        db = Database()
+        db.save_many([dict(RECORDS[0])])
+        self.assertEqual(len(db.sessions("9:00", "12:00")), 2)
+        db.save(dict(RECORDS[2]))
+        self.assertEqual(len(db.sessions("9:00", "13:00")), 3)
+        db.delete("id", "1")
+        self.assertEqual(len(db.sessions("9:00", "13:00")), 1)
+
+    def test_invalid_range_command(self):
+        Database().save_many([dict(data) for data in RECORDS])
+        parser = InputParser(
+            shfunc=main.scheduler_function, dbfunc=main.database_function
+        )
+        for argv in (["--between", "12", "15"], ["--between", "15:00", "12:00"]):
+            args = parser.parser.parse_args(["dbaccess", *argv])
+            with self.assertRaises(SystemExit) as error:
+                main.database_function(args)
+            self.assertIsInstance(error.exception.code, str)
+
+
+if __name__ == "__main__":
+    unittest.main()
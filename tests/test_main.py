@@ -0,0 +1,163 @@
+from models import Database, EmailSender, InputParser, MemoryTransport
+from tests.helpers import DatabaseTestCase
+from unittest import mock
+import contextlib
+import io
+import json
+import main
+import os
+import shutil
+import unittest
+
+
+class RecordingTransport(MemoryTransport):
+    """
+    Records whether the schedule was already saved when each message was sent
+    """
+
+    def __init__(self, db_name):
+        super().__init__()
+        self.db_name = db_name
+        self.saved_before_send = []
+
+    def send(self, sender_email, sender_passwd, receiver_email, text):
+        with open(self.db_name) as fd:
+            self.saved_before_send.append(len(json.load(fd)) == 1)
+        super().send(sender_email, sender_passwd, receiver_email, text)
+
+
+class TestSchedulerFunction(DatabaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.roster = os.path.join(self.tmpdir.name, "roster.csv")
+        shutil.copy("stub_data.csv", self.roster)
+
+    def parse(self, *argv):
+        parser = InputParser(
+            shfunc=main.scheduler_function, dbfunc=main.database_function
+        )
+        return parser.parser.parse_args(list(argv))
+
+    def test_schedule_is_saved_before_email_is_sent(self):
+        transport = RecordingTransport(self.db_name)
+        sender = EmailSender(
+            "lab@example.com", "secret", transport=transport, verbose=False
+        )
+        args = self.parse(
+            "--save",
+            "--email",
+            "--id",
+            "1",
+            "schedule",
+            "-f",
+            self.roster,
+            "-s",
+            "12:00:00",
+            "-e",
+            "15:00:00",
+            "-t",
+            "1:00:00",
+        )
+        out, err = io.StringIO(), io.StringIO()
+        with mock.patch.object(
+            main.EmailStudents, "prompt_sender", return_value=sender
+        ):
+            with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+                main.scheduler_function(args)
+
+        self.assertEqual(len(transport.outbox), 20)
+        self.assertTrue(all(transport.saved_before_send))
+        self.assertIn("emails sent: 20/20", err.getvalue())
+        self.assertIn("SESSION NUMBER: 2", out.getvalue())
+        self.assertEqual(len(Database().retrieve("id", "1")), 1)
+
+    def test_saved_schedule_is_matched_against_roster_before_sending(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.scheduler_function(
+                self.parse(
+                    "--save",
+                    "--id",
+                    "1",
+                    "schedule",
+                    "-f",
+                    self.roster,
+                    "-s",
+                    "12:00:00",
+                    "-e",
+                    "15:00:00",
+                    "-t",
+                    "1:00:00",
+                )
+            )
+        with open(self.roster, newline="") as fd:
+            roster = fd.read()
+        with open(self.roster, "w", newline="") as fd:
+            fd.write(roster.replace("chidubemmaduagwu@gmail.com", "not-an-email"))
+
+        for strict, sent in ((True, 0), (False, 19)):
+            transport = MemoryTransport()
+            sender = EmailSender(
+                "lab@example.com", "secret", transport=transport, verbose=False
+            )
+            argv = ["--strict"] if strict else []
+            args = self.parse(*argv, "--email", "dbaccess", "-r", "id", "1")
+            err = io.StringIO()
+            with mock.patch.object(
+                main.EmailStudents, "prompt_sender", return_value=sender
+            ), contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+                err
+            ):
+                if strict:
+                    with self.assertRaises(SystemExit):
+                        main.database_function(args)
+                else:
+                    main.database_function(args)
+            self.assertEqual(len(transport.outbox), sent)
+            self.assertIn("scheduled but not accepted in the roster", err.getvalue())
+
+    def test_strict_stops_before_scheduling(self):
+        with open(self.roster, "a", newline="") as fd:
+            fd.write("Broken Row,not-an-email\r\n")
+        rejects = os.path.join(self.tmpdir.name, "rejects.csv")
+        args = self.parse(
+            "--save",
+            "--strict",
+            "--rejects",
+            rejects,
+            "schedule",
+            "-f",
+            self.roster,
+            "-s",
+            "12:00:00",
+            "-e",
+            "15:00:00",
+            "-t",
+            "1:00:00",
+        )
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            with self.assertRaises(SystemExit):
+                main.scheduler_function(args)
+
+        self.assertIn("1 roster rows rejected", err.getvalue())
+        self.assertEqual(out.getvalue(), "")
+        self.assertFalse(os.path.exists(self.db_name))
+        with open(rejects) as fd:
+            self.assertIn("not-an-email,invalid email", fd.read())
+
+    def test_metrics_are_written_when_the_command_exits(self):
+        with open(self.roster, "a", newline="") as fd:
+            fd.write("Broken Row,not-an-email\r\n")
+        report = os.path.join(self.tmpdir.name, "metrics.json")
+        argv = ["main.py", "--strict", "--metrics", report]
+        argv += ["schedule", "-f", self.roster, "-s", "12:00:00", "-e", "15:00:00"]
+        argv += ["-t", "1:00:00"]
+        with mock.patch("sys.argv", argv), contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                main.main()
+        with open(report) as fd:
+            self.assertIn("parse", json.load(fd)["spans"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+from util.metrics import Metrics, count_groups
+import json
+import os
+import tempfile
+import unittest
+
+
+class TestMetrics(unittest.TestCase):
+    def test_span_accumulates_calls(self):
+        metrics = Metrics()
+        for _ in range(3):
+            with metrics.span("parse"):
+                pass
+        self.assertEqual(metrics.spans["parse"]["calls"], 3)
+        self.assertGreaterEqual(metrics.spans["parse"]["total_s"], 0)
+
+    def test_span_is_recorded_on_error(self):
+        metrics = Metrics()
+        with self.assertRaises(ValueError):
+            with metrics.span("save"):
+                raise ValueError
+        self.assertEqual(metrics.spans["save"]["calls"], 1)
+
+    def test_counters_and_dump(self):
+        metrics = Metrics()
+        metrics.incr("rows_parsed", 20)
+        metrics.incr("emails_sent")
+        metrics.incr("emails_sent")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file = os.path.join(tmpdir, "metrics.json")
+            metrics.dump(file)
+            with open(file) as fd:
+                report = json.load(fd)
+        self.assertEqual(report["counters"], {"rows_parsed": 20, "emails_sent": 2})
+
+    def test_count_groups(self):
+        schedule = [
+            {"groups": {"group 0": ["a"], "group 1": ["b"]}},
+            {"groups": ["c", "d"]},
+        ]
+        self.assertEqual(count_groups(schedule), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
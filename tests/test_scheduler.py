@@ -2,7 +2,7 @@ from dotenv import dotenv_values
 from datetime import timedelta
 from models import Scheduler
 from util import (
-    extract_values_from_data,
+    extract_key_values,
     csv_parser,
     convert_str_to_timedelta_obj,
     shuffle_ls,
@@ -14,7 +14,7 @@ class TestScheduler(unittest.TestCase):
     def setUp(self) -> None:
         file = dotenv_values().get("STUB_FILE", None)
         data = csv_parser(file)
-        self.students = extract_values_from_data(data, "Name")
+        self.students = extract_key_values(data, "Name")
 
     def test_correct_start_time_initialization(self):
         sh = Scheduler("12:00:00", "1:00:00", "00:30:00", self.students)
@@ -0,0 +1,98 @@
+from models import Database
+from models.formatter import SchedulerFormatter
+from models.service import ScheduleService, create_server
+from tests.helpers import DatabaseTestCase, record
+from unittest import mock
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+import json
+import threading
+import unittest
+
+
+class TestScheduleService(DatabaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.service = ScheduleService(cache_size=2)
+        self.service.save(record("1"))
+        self.server = create_server(self.service, port=0)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(
+            target=self.server.serve_forever, args=(0.01,), daemon=True
+        ).start()
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        with urlopen(Request(self.url + path, data=data, method=method)) as response:
+            return response.status, response.read().decode()
+
+    def test_retrieve(self):
+        status, body = self.request("GET", "/schedules?key=id&value=1")
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)[0]["course"], "MCT543")
+
+    def test_save_and_delete_persist(self):
+        self.request("POST", "/schedules", record("2"))
+        self.assertEqual(len(Database().retrieve("id", "2")), 1)
+        status, body = self.request("DELETE", "/schedules?key=id&value=2")
+        self.assertEqual(json.loads(body), {"deleted": 1})
+        self.assertEqual(Database().retrieve("id", "2"), [])
+
+    def test_render_is_cached_and_invalidated(self):
+        _, body = self.request("GET", "/render?key=course&value=MCT543&format=csv")
+        self.assertIn("Adam Adams", body)
+        self.assertEqual(len(self.service.rendered), 1)
+        self.request("POST", "/schedules", record("3"))
+        self.assertEqual(len(self.service.rendered), 0)
+
+    def test_render_cache_is_bounded(self):
+        for fmt in ("text", "csv", "jsonl"):
+            self.service.render("id", "1", fmt)
+        self.assertEqual(list(k[2] for k in self.service.rendered), ["csv", "jsonl"])
+
+    def test_render_racing_a_write_is_not_cached(self):
+        format_ = SchedulerFormatter.format
+
+        def save_while_rendering(formatter):
+            self.service.save(record("4"))
+            return format_(formatter)
+
+        with mock.patch.object(SchedulerFormatter, "format", save_while_rendering):
+            self.service.render("course", "MCT543")
+        self.assertEqual(len(self.service.rendered), 0)
+        rendered = self.service.render("course", "MCT543", "jsonl")
+        self.assertEqual(
+            {json.loads(l)["id"] for l in rendered.splitlines()}, {"1", "4"}
+        )
+
+    def test_retrieve_is_cached_and_invalidated(self):
+        self.request("GET", "/schedules?key=course&value=MCT543")
+        self.assertIn(("schedules", "course", "MCT543"), self.service.rendered)
+        self.request("POST", "/schedules", record("5"))
+        _, body = self.request("GET", "/schedules?key=course&value=MCT543")
+        self.assertEqual([data["id"] for data in json.loads(body)], ["1", "5"])
+
+    def test_body_must_be_an_object(self):
+        for body in ([], "x"):
+            with self.assertRaises(HTTPError) as error:
+                self.request("POST", "/schedules", body)
+            self.assertEqual(error.exception.code, 400)
+        self.assertEqual(self.service.count(), 1)
+
+    def test_retrieve_returns_copies(self):
+        (data,) = self.service.retrieve("id", "1")
+        data["course"] = "changed"
+        self.assertEqual(self.service.retrieve("id", "1")[0]["course"], "MCT543")
+
+    def test_missing_parameter(self):
+        with self.assertRaises(HTTPError) as error:
+            self.request("GET", "/schedules?key=id")
+        self.assertEqual(error.exception.code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+from models import Database, InputParser, open_database
+from models.shards import ShardedDatabase, session_order
+from tests.helpers import DatabaseTestCase, record
+from unittest import mock
+from util.metrics import Metrics
+import contextlib
+import io
+import json
+import os
+import main
+import unittest
+
+
+class TestShardedDatabase(DatabaseTestCase):
+    db_file = "db"
+    environ = {"DB_LAYOUT": "sharded"}
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.directory = self.db_name
+        db = ShardedDatabase()
+        for i, (session, semester) in enumerate(
+            [
+                ("2021", "first"),
+                ("2022", "first"),
+                ("2022", "second"),
+                ("2023", "first"),
+            ]
+        ):
+            db.save(record(str(i), session=session, semester=semester))
+
+    def test_one_file_per_session_and_semester(self):
+        files = sorted(f for f in os.listdir(self.directory) if f.endswith(".json"))
+        self.assertEqual(
+            files,
+            [
+                "2021-first.json",
+                "2022-first.json",
+                "2022-second.json",
+                "2023-first.json",
+                "manifest.json",
+            ],
+        )
+        self.assertIsInstance(open_database(), ShardedDatabase)
+
+    def test_retrieve_only_opens_matching_shards(self):
+        db = ShardedDatabase()
+        self.assertEqual([r["id"] for r in db.retrieve("session", "2022")], ["1", "2"])
+        self.assertEqual(len(db.shards), 2)
+        self.assertEqual(db.retrieve("id", "3")[0]["session"], "2023")
+        self.assertEqual(len(db.shards), 3)
+        self.assertEqual(db.retrieve("course", "MCT543")[0]["id"], "0")
+
+    def test_revision_moves_record_to_its_new_shard(self):
+        db = ShardedDatabase()
+        data = record("0", semester="second")
+        data["schedule"][0]["groups"]["group 1"].append("d")
+        db.save(data)
+        db = ShardedDatabase()
+        self.assertEqual(db.retrieve("session", "2021"), [])
+        (moved,) = db.retrieve("id", "0")
+        self.assertEqual((moved["semester"], moved["version"]), ("second", 2))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.directory, "2021-first.json"))
+        )
+
+    def test_delete(self):
+        db = ShardedDatabase()
+        self.assertEqual(len(db.delete("semester", "first")), 3)
+        self.assertEqual([r["id"] for r in ShardedDatabase().db], ["2"])
+        self.assertEqual(db.stats.query()[0]["schedules"], 1)
+
+    def test_expire_keeps_newest_sessions(self):
+        db = ShardedDatabase()
+        expired = db.expire(2)
+        self.assertEqual([json.loads(key)[0] for key in expired], ["2021"])
+        self.assertEqual(db.shards, {})
+        db = ShardedDatabase()
+        self.assertEqual(sorted(r["id"] for r in db.db), ["1", "2", "3"])
+        self.assertEqual(db.stats.query()[0]["schedules"], 3)
+        with mock.patch.dict(os.environ, {"RETENTION_SESSIONS": "1"}):
+            self.assertEqual(len(db.expire()), 2)
+        self.assertEqual(db.retrieve("id", "1"), [])
+
+    def test_migrate_keeps_ids(self):
+        source = os.path.join(self.tmpdir.name, "db.json")
+        with mock.patch.dict(os.environ, {"DB_NAME": source, "DB_LAYOUT": ""}):
+            self.assertIs(type(open_database()), Database)
+        with open(source, "w") as fd:
+            json.dump(
+                [
+                    record("10", session="2024"),
+                    record("11", session="2024", semester="second"),
+                ],
+                fd,
+            )
+        db = ShardedDatabase()
+        self.assertEqual(db.migrate(source), 2)
+        self.assertEqual(
+            ShardedDatabase().retrieve("id", "11")[0]["semester"], "second"
+        )
+        self.assertEqual(db.stats.query()[0]["schedules"], 6)
+
+    def test_expire_command(self):
+        parser = InputParser(
+            shfunc=main.scheduler_function, dbfunc=main.database_function
+        )
+        for argv in (["--expire"], ["--expire", "0"]):
+            args = parser.parser.parse_args(["dbaccess", *argv])
+            with mock.patch.dict(os.environ, {"RETENTION_SESSIONS": ""}):
+                with self.assertRaises(SystemExit) as error:
+                    main.database_function(args)
+            self.assertIsInstance(error.exception.code, str)
+
+        metrics = Metrics()
+        args = parser.parser.parse_args(["dbaccess", "--expire", "2"])
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.database_function(args, metrics)
+        manifest = os.path.join(self.directory, "manifest.json")
+        self.assertEqual(metrics.counters["bytes_written"], os.path.getsize(manifest))
+
+    def test_bytes_written_counts_rewritten_shards(self):
+        def size(directory):
+            return sum(
+                os.path.getsize(os.path.join(directory, file))
+                for file in os.listdir(directory)
+                if file != "manifest.json"
+            )
+
+        stats = os.path.join(self.directory, "stats")
+        appended = -size(stats)
+        db = ShardedDatabase()
+        db.save(record("9"))
+        # the aggregates append the changed rows and rewrite their manifest
+        appended += size(stats) + os.path.getsize(os.path.join(stats, "manifest.json"))
+        self.assertEqual(
+            db.bytes_written,
+            appended
+            + sum(
+                os.path.getsize(os.path.join(self.directory, file))
+                for file in ("2023-first.json", "manifest.json")
+            ),
+        )
+
+    def test_session_order(self):
+        sessions = ["2022/2023", "2021/2022", None, "2023"]
+        self.assertEqual(
+            sorted(sessions, key=session_order),
+            [None, "2021/2022", "2022/2023", "2023"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,21 @@
+import subprocess
+import sys
+import unittest
+
+from benchmarks.startup import LAZY_MODULES
+
+
+class TestStartupImports(unittest.TestCase):
+    def test_heavy_modules_are_imported_lazily(self):
+        code = (
+            "import sys, main; "
+            f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+        )
+        proc = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        self.assertEqual(proc.stdout.strip(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+from models import Database
+from models.stats import ScheduleStats
+from tests.helpers import DatabaseTestCase, record
+import json
+import os
+import unittest
+
+
+class TestScheduleStats(DatabaseTestCase):
+    def test_totals(self):
+        stats = ScheduleStats(self.tmpdir.name)
+        stats.rebuild([record("1"), record("2", course="MCT524")])
+        (row,) = stats.query()
+        self.assertEqual(row["schedules"], 2)
+        self.assertEqual(row["sessions"], 4)
+        self.assertEqual(row["groups"], 6)
+        self.assertEqual(row["students"], 10)
+        self.assertEqual(row["avg_group_size"], 1.67)
+
+    def test_ungrouped_session(self):
+        stats = ScheduleStats(self.tmpdir.name)
+        data = record("1")
+        data["schedule"][1]["groups"] = ["Anna Fox", "Gabriel Lee"]
+        stats.rebuild([data])
+        (row,) = stats.query()
+        self.assertEqual((row["groups"], row["students"]), (3, 5))
+
+    def test_group_by(self):
+        stats = ScheduleStats(self.tmpdir.name)
+        stats.rebuild([record("1"), record("2", course="MCT524"), record("3")])
+        rows = stats.query(["course", "slot"])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(
+            rows[-1],
+            {
+                "course": "MCT543",
+                "slot": "13:00:00-14:00:00",
+                "schedules": 2,
+                "sessions": 2,
+                "groups": 2,
+                "students": 4,
+                "avg_group_size": 2.0,
+                "avg_students_per_session": 2.0,
+            },
+        )
+
+    def test_fine_slot_groups_are_counted_from_records(self):
+        records = [record("1"), record("2", day="Monday"), record("3")]
+        stats = ScheduleStats(self.tmpdir.name)
+        stats.rebuild(records)
+        with self.assertRaises(ValueError):
+            stats.query(["course", "day", "slot"])
+        rows = stats.query(["course", "day", "slot"], records)
+        self.assertEqual([row["schedules"] for row in rows], [1, 1, 2, 2])
+
+    def test_remove_drops_empty_rows(self):
+        stats = ScheduleStats(self.tmpdir.name)
+        stats.rebuild([record("1"), record("2", course="MCT524")])
+        stats.remove(record("2", course="MCT524"))
+        self.assertEqual([row["course"] for row in stats.query(["course"])], ["MCT543"])
+
+    def test_unknown_dimension(self):
+        with self.assertRaises(ValueError):
+            ScheduleStats(self.tmpdir.name).query(["room"])
+
+    def test_maintained_by_database(self):
+        db = Database()
+        db.save(record("1"))
+        db.save(record("2", semester="second"))
+        db.delete("id", "1")
+
+        stats = ScheduleStats(f"{self.db_name}.stats")
+        self.assertTrue(stats.fresh(self.db_name))
+        self.assertEqual(
+            [row["semester"] for row in stats.query(["semester"])], ["second"]
+        )
+
+    def test_writes_append_changed_rows(self):
+        db = Database()
+        db.save(record("1"))
+        db.save(record("2", course="MCT524"))
+        db.delete("id", "1")
+
+        directory = f"{self.db_name}.stats"
+        with open(f"{directory}/course.jsonl") as fd:
+            self.assertEqual(len(fd.readlines()), 3)
+        self.assertFalse(os.path.exists(f"{directory}/course+day+slot.jsonl"))
+        stats = ScheduleStats(directory)
+        self.assertTrue(stats.fresh(self.db_name))
+        self.assertEqual([row["course"] for row in stats.query(["course"])], ["MCT524"])
+
+    def test_rebuilt_when_database_changed_outside(self):
+        Database().save(record("1"))
+        with open(self.db_name, "w") as fd:
+            json.dump([record("1"), record("2")], fd)
+        self.assertEqual(Database().stats.query()[0]["schedules"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
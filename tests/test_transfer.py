@@ -0,0 +1,103 @@
+from models import Database, InputParser
+from models.transfer import (
+    content_hash,
+    export_records,
+    import_records,
+    read_records,
+    write_records,
+)
+from tests.helpers import DatabaseTestCase, record
+from unittest import mock
+import contextlib
+import io
+import main
+import os
+import unittest
+
+
+class TestTransfer(DatabaseTestCase):
+    environ = {"CURRENT_DB_ID": "10"}
+
+    def setUp(self) -> None:
+        super().setUp()
+        # reserved ids are written to .env in the working directory
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.tmpdir.name)
+
+    def test_csv_round_trip(self):
+        records = [record("1"), record("2", course="MCT524")]
+        records[1].update({"version": 2, "revisions": [{"version": 2, "changes": {}}]})
+        for fmt in ("csv", "jsonl"):
+            out = io.StringIO()
+            self.assertEqual(write_records(records, out, fmt), 2)
+            out.seek(0)
+            read = list(read_records(out, fmt))
+            self.assertEqual([r["course"] for r in read], ["MCT543", "MCT524"])
+            self.assertEqual(read[1]["revisions"], records[1]["revisions"])
+            self.assertEqual(
+                list(map(content_hash, read)), list(map(content_hash, records))
+            )
+
+    def test_content_hash_ignores_id(self):
+        self.assertEqual(content_hash(record("1")), content_hash(record("2")))
+        self.assertNotEqual(
+            content_hash(record("1")), content_hash(record("1", course="X"))
+        )
+
+    def test_import_remaps_ids_and_skips_duplicates(self):
+        Database().save(record("1"))
+        file = os.path.join(self.tmpdir.name, "export.jsonl")
+        with open(file, "w") as fd:
+            write_records(
+                [record("1"), record("1", course="A"), record("7", course="B")], fd
+            )
+            write_records([record("9", course="A")], fd)
+
+        counts = import_records(Database(), file, batch_size=1)
+        self.assertEqual(counts, {"imported": 2, "duplicates": 2})
+        db = Database()
+        self.assertEqual([r["id"] for r in db.db], ["1", "11", "12"])
+        self.assertEqual(os.environ["CURRENT_DB_ID"], "12")
+        self.assertEqual(db.stats.query()[0]["schedules"], 3)
+
+    def test_import_command_saves_single_file_once(self):
+        file = os.path.join(self.tmpdir.name, "export.jsonl")
+        with open(file, "w") as fd:
+            write_records([record(str(i), course=str(i)) for i in range(3)], fd)
+        parser = InputParser(
+            shfunc=main.scheduler_function, dbfunc=main.database_function
+        )
+        args = parser.parser.parse_args(
+            ["dbaccess", "--import", file, "--batch-size", "1"]
+        )
+        err = io.StringIO()
+        with mock.patch.object(
+            Database, "write", autospec=True, side_effect=Database.write
+        ) as write, contextlib.redirect_stdout(
+            io.StringIO()
+        ), contextlib.redirect_stderr(
+            err
+        ):
+            main.database_function(args)
+        # once creating the database file and once for the import
+        self.assertEqual(write.call_count, 2)
+        self.assertIn("DB_LAYOUT=sharded", err.getvalue())
+        self.assertEqual(len(Database().db), 3)
+
+    def test_export_csv(self):
+        db = Database()
+        db.save_many(
+            [record("1", date=None, email=False), record("2", course="MCT524")]
+        )
+        file = os.path.join(self.tmpdir.name, "export.csv")
+        self.assertEqual(export_records(db, file), 2)
+        with open(file, newline="") as fd:
+            exported = list(read_records(fd, "csv"))
+        self.assertEqual([r["id"] for r in exported], ["1", "2"])
+        self.assertEqual(exported[0]["schedule"], db.db[0]["schedule"])
+        self.assertNotIn("date", exported[0])
+        self.assertIs(exported[0]["email"], False)
+
+
+if __name__ == "__main__":
+    unittest.main()
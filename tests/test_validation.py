@@ -0,0 +1,67 @@
+from models import Email, EmailSender, MemoryTransport
+from util import validation
+from util.validation import validate_roster
+from unittest import mock
+import csv
+import os
+import tempfile
+import unittest
+
+ROSTER = [
+    {"Name": "  Adam   Adams ", "Email": " Adam@Example.com "},
+    {"Name": "Taylor Wall", "Email": "taylor@example"},
+    {"Name": "", "Email": "nobody@example.com"},
+    {"Name": "Anna Fox", "Email": "adam@example.com"},
+    {"Name": "Adam Adams", "Email": "adam2@example.com"},
+    {"Name": "Grace Obi", "Email": None},
+    {"Name": "Grace Eze", "Email": "grace@example.org"},
+]
+
+
+class TestValidateRoster(unittest.TestCase):
+    def test_normalizes_and_rejects(self):
+        report = validate_roster(ROSTER, workers=1)
+        self.assertEqual(
+            report.students,
+            {"Adam Adams": "adam@example.com", "Grace Eze": "grace@example.org"},
+        )
+        self.assertEqual(
+            [(row["line"], row["reason"]) for row in report.rejects],
+            [
+                (3, "invalid email"),
+                (4, "missing name"),
+                (5, "duplicate email (line 2)"),
+                (6, "duplicate name (line 2)"),
+                (7, "missing email"),
+            ],
+        )
+
+    def test_parallel_matches_serial(self):
+        roster = ROSTER * 3
+        with mock.patch.multiple(validation, PARALLEL_THRESHOLD=1, CHUNK_SIZE=4):
+            parallel = validate_roster(roster, workers=2)
+        serial = validate_roster(roster, workers=1)
+        self.assertEqual(parallel.students, serial.students)
+        self.assertEqual(parallel.rejects, serial.rejects)
+
+    def test_write_rejects(self):
+        report = validate_roster(ROSTER, workers=1)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file = os.path.join(tmpdir, "rejects.csv")
+            self.assertEqual(report.write_rejects(file), 5)
+            with open(file, newline="") as fd:
+                rows = list(csv.DictReader(fd))
+        self.assertEqual(rows[0]["Email"], "taylor@example")
+        self.assertEqual(rows[0]["reason"], "invalid email")
+
+
+class TestEmailSetters(unittest.TestCase):
+    def test_non_string_emails_raise(self):
+        with self.assertRaises(TypeError):
+            Email(None, "subject", "body")
+        with self.assertRaises(TypeError):
+            EmailSender(42, "secret", transport=MemoryTransport())
+
+
+if __name__ == "__main__":
+    unittest.main()
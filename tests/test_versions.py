@@ -0,0 +1,116 @@
+from copy import deepcopy
+from models import Database
+from models.versions import add_revision, diff, fields_at, schedule_at
+from tests import helpers
+from tests.helpers import DatabaseTestCase, session
+import unittest
+
+
+def schedule():
+    # the shared two sessions and an ungrouped third one
+    return helpers.schedule() + [
+        session(2, "14:00:00", "15:00:00", ["Grace Eze", "Ada Obi"])
+    ]
+
+
+def swap(sh_a, group_a, sh_b, group_b, base=None):
+    """
+    Swaps the first student of two groups
+    """
+    new = deepcopy(base or schedule())
+    a, b = new[sh_a]["groups"][group_a], new[sh_b]["groups"][group_b]
+    a[0], b[0] = b[0], a[0]
+    return new
+
+
+class TestVersions(unittest.TestCase):
+    def test_revision_stores_only_changed_groups(self):
+        record = {"id": "1", "schedule": schedule()}
+        version = add_revision(record, swap(0, "group 0", 0, "group 1"))
+        self.assertEqual(version, 2)
+        (revision,) = record["revisions"]
+        self.assertEqual(list(revision["changes"]), ["0"])
+        self.assertEqual(
+            set(revision["changes"]["0"]["groups"]), {"group 0", "group 1"}
+        )
+
+    def test_identical_schedule_adds_no_version(self):
+        record = {"id": "1", "schedule": schedule()}
+        self.assertEqual(add_revision(record, schedule()), 1)
+        self.assertNotIn("revisions", record)
+
+    def test_schedule_at_rebuilds_every_version(self):
+        versions = [schedule(), swap(0, "group 1", 1, "group 0")]
+        versions.append(swap(0, "group 0", 0, "group 1", versions[1]))
+        versions.append(versions[2][:2])
+        record = {"id": "1", "schedule": deepcopy(versions[0])}
+        for version in versions[1:]:
+            add_revision(record, deepcopy(version))
+        for number, version in enumerate(versions, start=1):
+            self.assertEqual(schedule_at(record, number), version)
+
+    def test_unchanged_sessions_are_shared(self):
+        record = {"id": "1", "schedule": schedule()}
+        add_revision(record, swap(0, "group 0", 0, "group 1"))
+        old = schedule_at(record, 1)
+        self.assertIs(old[1], record["schedule"][1])
+
+    def test_diff(self):
+        record = {"id": "1", "schedule": schedule()}
+        add_revision(record, swap(0, "group 1", 1, "group 0"))
+        self.assertEqual(
+            diff(record, 1, 2),
+            [
+                {"name": "Anna Fox", "from": [1, "group 0"], "to": [0, "group 1"]},
+                {"name": "Jason Torres", "from": [0, "group 1"], "to": [1, "group 0"]},
+            ],
+        )
+        self.assertEqual(diff(record, 2, 2), [])
+
+    def test_fields_are_versioned(self):
+        record = {"id": "1", "semester": "first", "end_time": "15:00:00"}
+        record["schedule"] = schedule()
+        add_revision(
+            record, schedule(), {"id": "1", "semester": "second", "room": "B12"}
+        )
+        self.assertEqual(record["version"], 2)
+        self.assertEqual(record["revisions"][0]["changes"], {})
+        self.assertEqual(
+            fields_at(record, 1),
+            {"id": "1", "semester": "first", "end_time": "15:00:00"},
+        )
+        self.assertEqual(fields_at(record, 2)["room"], "B12")
+        self.assertEqual(add_revision(record, schedule(), {"room": "B12"}), 2)
+
+    def test_diff_unknown_version(self):
+        with self.assertRaises(ValueError):
+            diff({"id": "1", "schedule": schedule()}, 1, 3)
+
+
+class TestDatabaseVersions(DatabaseTestCase):
+    def test_saving_existing_id_adds_version(self):
+        db = Database()
+        db.save({"id": "1", "course": "MCT543", "schedule": schedule()})
+        db.save(
+            {
+                "id": "1",
+                "course": "MCT543",
+                "schedule": swap(0, "group 0", 1, "group 0"),
+            }
+        )
+
+        db = Database()
+        self.assertEqual(len(db.db), 1)
+        self.assertEqual(db.record("1")["version"], 2)
+        self.assertEqual(db.version("1", 1)["schedule"], schedule())
+        db.save({"id": "1", "course": "MCT524", "schedule": schedule()})
+        self.assertEqual(db.version("1", 2)["course"], "MCT543")
+        self.assertEqual(db.version("1", 3)["course"], "MCT524")
+        self.assertEqual(
+            [move["name"] for move in db.diff("1", 1, 2)], ["Adam Adams", "Anna Fox"]
+        )
+        self.assertEqual(db.stats.query()[0]["schedules"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
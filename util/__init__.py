@@ -1,7 +1,6 @@
 from typing import List, Any, Union
 from datetime import timedelta
 import csv
-import faker
 import random
 import re
 import io
@@ -28,6 +27,9 @@ def csv_parser(file: Union[str, io.TextIOWrapper]) -> List[Any]:
 
 
 def generate_fake_data():
+    # faker is slow to import and only needed here
+    import faker
+
     # Initialize Faker to generate fake data
     fake = faker.Faker()
 
@@ -74,8 +76,11 @@ def extract_key_values(data: List[dict], key: str):
     return values
 
 
+EMAIL_PATTERN = re.compile(r"^[\w\.-]+@[\w\.-]+(\.[\w]+)+$")
+
+
 def check_valid_email(email):
-    if not re.match(r"^[\w\.-]+@[\w\.-]+(\.[\w]+)+$", email):
+    if not EMAIL_PATTERN.match(email):
         raise ValueError("Invalid email format")
 
 
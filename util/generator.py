@@ -0,0 +1,183 @@
+from typing import Iterator, Optional, TextIO, Tuple
+import csv
+import json
+import math
+import random
+import sys
+
+from models import Scheduler
+
+FIRST_NAMES = [
+    "Adam", "Ada", "Amaka", "Anna", "Antonio", "Brandon", "Brittany", "Carl",
+    "Cassandra", "Chidubem", "Chinedu", "Chris", "Daniel", "Derrick", "Domenica",
+    "Ebuka", "Emeka", "Emily", "Fatima", "Gabriel", "Grace", "Hassan", "Ifeoma",
+    "Isaac", "Jason", "Jessica", "John", "Joy", "Kelechi", "Kemi", "Laura", "Lisa",
+    "Mariam", "Matthew", "Michael", "Musa", "Nathaniel", "Ngozi", "Obinna", "Olivia",
+    "Patricia", "Peter", "Rachel", "Samuel", "Sarah", "Tammy", "Taylor", "Tunde",
+    "Uche", "Victoria", "Yusuf", "Zainab",
+]  # fmt: skip
+
+LAST_NAMES = [
+    "Adams", "Adeyemi", "Bello", "Brown", "Campbell", "Carlson", "Chukwu", "Eze",
+    "Flores", "Fox", "Garcia", "Ibrahim", "Johnson", "Lambert", "Lee", "Maduagwu",
+    "Mcclure", "Mclaughlin", "Mgbe", "Morales", "Nelson", "Nwosu", "Obi", "Okafor",
+    "Okeke", "Olawale", "Robinson", "Santos", "Smith", "Torres", "Vasquez", "Wall",
+    "Webb", "Weber", "Williams", "Yusuf",
+]  # fmt: skip
+
+DOMAINS = ["example.com", "example.org", "mail.example.net", "students.example.edu"]
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+SEMESTERS = ["first", "second"]
+
+
+class SeededScheduler(Scheduler):
+    """
+    Scheduler that shuffles students with its own random generator so archives are reproducible
+    """
+
+    def __init__(self, rng: random.Random, *args, **kwargs):
+        self.rng = rng
+        super().__init__(*args, **kwargs)
+
+    def shuffle_students(self):
+        self.rng.shuffle(self.students)
+
+
+def generate_roster(rows: int, seed: Optional[int] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Lazily generates (name, email) pairs. Every name and email is unique, once all
+    first/last name combinations are used a number is appended to the name.
+    :param rows: number of rows to generate
+    :param seed: (Optional) seed for a reproducible roster
+    :return: iterator of (name, email)
+    """
+    rng = random.Random(seed)
+    first_names = FIRST_NAMES.copy()
+    last_names = LAST_NAMES.copy()
+    rng.shuffle(first_names)
+    rng.shuffle(last_names)
+    no_of_first, no_of_last = len(first_names), len(last_names)
+    combinations = no_of_first * no_of_last
+    offset = rng.randrange(combinations)
+    # stepping with a stride coprime to the number of combinations visits every
+    # combination once per cycle while spreading consecutive rows across last names
+    stride = rng.randrange(1, combinations)
+    while math.gcd(stride, combinations) != 1:
+        stride += 1
+
+    for i in range(rows):
+        index = (offset + i * stride) % combinations
+        cycle = i // combinations
+        first = first_names[index % no_of_first]
+        last = last_names[index // no_of_first]
+        suffix = str(cycle) if cycle else ""
+        name = f"{first} {last} {suffix}" if suffix else f"{first} {last}"
+        domain = DOMAINS[i % len(DOMAINS)]
+        yield name, f"{first}.{last}{suffix}@{domain}".lower()
+
+
+def open_output(file: str) -> TextIO:
+    if file == "-":
+        return sys.stdout
+    return open(file, "w", newline="", buffering=1024 * 1024)
+
+
+def write_roster(
+    file: str, rows: int, seed: Optional[int] = None, chunk_size: int = 10000
+) -> int:
+    """
+    Streams a roster csv (Name, Email) to file without holding it in memory
+    :param file: path to write to, "-" for stdout
+    :param rows: number of students
+    :param seed: (Optional) seed for a reproducible roster
+    :param chunk_size: number of rows written at a time
+    :return: number of rows written
+    """
+    out = open_output(file)
+    try:
+        writer = csv.writer(out)
+        writer.writerow(["Name", "Email"])
+        chunk = []
+        for row in generate_roster(rows, seed):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                writer.writerows(chunk)
+                chunk = []
+        writer.writerows(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return rows
+
+
+def generate_archive(
+    schedules: int,
+    students: int,
+    seed: Optional[int] = None,
+    no_per_group: Optional[str] = "3",
+    first_id: int = 1,
+) -> Iterator[dict]:
+    """
+    Lazily generates schedule records shaped like the ones saved by `main.py schedule --save`
+    :param schedules: number of schedule records
+    :param students: number of students in each schedule
+    :param seed: (Optional) seed for a reproducible archive
+    :param no_per_group: (Optional) number of students per group
+    :param first_id: (Optional) id of the first record, the others follow it
+    :return: iterator of schedule records
+    """
+    rng = random.Random(seed)
+    names = [name for name, _ in generate_roster(students, seed)]
+    for i in range(schedules):
+        start_hour = rng.randrange(8, 15)
+        hours = rng.randrange(2, 5)
+        start_time = f"{start_hour}:00:00"
+        end_time = f"{start_hour + hours}:00:00"
+        scheduler = SeededScheduler(
+            rng, start_time, end_time, "1:00:00", names.copy(), no_per_group
+        )
+        yield {
+            "schedule": scheduler.generate_schedules(),
+            "email": False,
+            "subject": "LAB SCHEDULE",
+            "course": f"MCT{rng.randrange(100, 600)}",
+            "session": str(rng.randrange(2000, 2025)),
+            "semester": rng.choice(SEMESTERS),
+            "id": str(first_id + i),
+            "day": rng.choice(DAYS),
+            "date": None,
+            "file": None,
+            "start_time": start_time,
+            "end_time": end_time,
+            "tps": "1:00:00",
+            "npsg": no_per_group,
+        }
+
+
+def write_archive(
+    file: str,
+    schedules: int,
+    students: int,
+    seed: Optional[int] = None,
+    no_per_group: Optional[str] = "3",
+    first_id: int = 1,
+) -> int:
+    """
+    Streams a db.json style archive to file one record at a time
+    :param first_id: (Optional) id of the first record, see generate_archive
+    :return: number of records written
+    """
+    out = open_output(file)
+    try:
+        out.write("[")
+        for i, record in enumerate(
+            generate_archive(schedules, students, seed, no_per_group, first_id)
+        ):
+            if i:
+                out.write(", ")
+            out.write(json.dumps(record))
+        out.write("]")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return schedules
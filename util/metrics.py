@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+import json
+import sys
+import time
+
+
+class Metrics:
+    """
+    Collects timing spans and counters for a run of the command line tool
+    """
+
+    def __init__(self):
+        self.spans: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str):
+        """
+        Times the enclosed block. Repeated spans with the same name are accumulated
+        :param name: name of the stage
+        """
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            span = self.spans.setdefault(name, {"calls": 0, "total_s": 0.0})
+            span["calls"] += 1
+            span["total_s"] += elapsed
+
+    def incr(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "total_s": time.perf_counter() - self.started,
+            "spans": self.spans,
+            "counters": self.counters,
+        }
+
+    def dump(self, file: str):
+        with open(file, "w") as fd:
+            json.dump(self.report(), fd, indent=2)
+
+
+def profile(func: Callable[[], Any], file: str, top: int = 25) -> Any:
+    """
+    Runs func under cProfile and tracemalloc.
+    The cProfile stats are dumped to file (readable with pstats or snakeviz) and the
+    largest memory allocations to file + ".memory.txt"
+    :param func: function to run
+    :param file: path of the profile output
+    :param top: number of allocation sites reported
+    :return: the return value of func
+    """
+    # only imported when profiling is requested
+    import cProfile
+    import tracemalloc
+
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    try:
+        return profiler.runcall(func)
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        profiler.dump_stats(file)
+        with open(f"{file}.memory.txt", "w") as fd:
+            fd.write(f"current: {current} bytes\npeak: {peak} bytes\n\n")
+            for stat in snapshot.statistics("lineno")[:top]:
+                fd.write(f"{stat}\n")
+        print(f"profile written to {file} and {file}.memory.txt", file=sys.stderr)
+
+
+def count_groups(schedule: Optional[list]) -> int:
+    """
+    Counts the groups in a generated schedule, ungrouped sessions count as one group
+    """
+    groups = 0
+    for sh in schedule or []:
+        groups += len(sh["groups"]) if isinstance(sh["groups"], dict) else 1
+    return groups
@@ -0,0 +1,139 @@
+"""
+Roster validation, run once right after a roster is read and before any scheduling
+or sending. Names and emails are normalized, and rows with a missing name, a
+malformed email, or a name or email already used by an earlier row are rejected
+with a reason instead of failing half way through a run.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import csv
+import os
+
+from util import EMAIL_PATTERN
+
+# rosters with fewer rows are validated in process, forking costs more than it saves
+PARALLEL_THRESHOLD = 200000
+CHUNK_SIZE = 50000
+REJECT_FIELDS = ["line", "Name", "Email", "reason"]
+
+# (line in the csv, name, email)
+Row = Tuple[int, str, str]
+
+
+def normalize_name(name: Optional[str]) -> str:
+    return " ".join((name or "").split())
+
+
+def normalize_email(email: Optional[str]) -> str:
+    return (email or "").strip().lower()
+
+
+def check_rows(rows: List[Row]) -> List[Tuple[int, str, str, Optional[str]]]:
+    """
+    Normalizes a chunk of rows and checks each on its own
+    :return: (line, name, email, reason or None if valid) for every row
+    """
+    match = EMAIL_PATTERN.match
+    checked = []
+    for line, name, email in rows:
+        name, email = normalize_name(name), normalize_email(email)
+        if not name:
+            reason = "missing name"
+        elif not email:
+            reason = "missing email"
+        elif not match(email):
+            reason = "invalid email"
+        else:
+            reason = None
+        checked.append((line, name, email, reason))
+    return checked
+
+
+class RosterReport:
+    """
+    Outcome of validating a roster: the accepted students and the rejected rows
+    """
+
+    def __init__(self):
+        self.students: Dict[str, str] = {}
+        self.rejects: List[Dict[str, str]] = []
+
+    def reject(self, line: int, name: str, email: str, reason: str):
+        self.rejects.append(
+            {"line": line, "Name": name, "Email": email, "reason": reason}
+        )
+
+    def match(self, names: Iterable[str]) -> Dict[str, str]:
+        """
+        Emails of the students of a saved schedule, keyed by the names as saved.
+        Scheduled names without an accepted roster row are added to the rejects
+        :param names: names in the schedule
+        :return: name -> email
+        """
+        matched = {}
+        for name in names:
+            if (email := self.students.get(normalize_name(name))) is not None:
+                matched[name] = email
+            else:
+                self.reject("", name, "", "scheduled but not accepted in the roster")
+        return matched
+
+    def write_rejects(self, file: str) -> int:
+        """
+        Writes the rejected rows to a csv file
+        :return: number of rows written
+        """
+        with open(file, "w", newline="") as fd:
+            writer = csv.DictWriter(fd, REJECT_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.rejects)
+        return len(self.rejects)
+
+
+def chunks(rows: List[Row], size: int) -> List[List[Row]]:
+    return [rows[i : i + size] for i in range(0, len(rows), size)]
+
+
+def validate_roster(
+    file_data: List[dict], workers: Optional[int] = None
+) -> RosterReport:
+    """
+    Validates the rows of a roster csv (Name, Email) in one pass.
+    Rows are checked in parallel across processes for very large rosters, duplicates
+    are then found in csv order so the first occurrence is the one kept
+    :param file_data: rows as read by csv_parser
+    :param workers: (Optional) number of processes, 1 to never fork
+    :return: RosterReport
+    """
+    # line 1 is the header
+    rows = [
+        (i, row.get("Name"), row.get("Email")) for i, row in enumerate(file_data, 2)
+    ]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(rows) >= PARALLEL_THRESHOLD:
+        # only imported for rosters large enough to be checked in parallel
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(workers) as executor:
+            checked = [
+                row
+                for chunk in executor.map(check_rows, chunks(rows, CHUNK_SIZE))
+                for row in chunk
+            ]
+    else:
+        checked = check_rows(rows)
+
+    report = RosterReport()
+    name_lines: Dict[str, int] = {}
+    email_lines: Dict[str, int] = {}
+    for line, name, email, reason in checked:
+        if reason is None and name in name_lines:
+            reason = f"duplicate name (line {name_lines[name]})"
+        elif reason is None and email in email_lines:
+            reason = f"duplicate email (line {email_lines[email]})"
+        if reason is not None:
+            report.reject(line, name, email, reason)
+            continue
+        name_lines[name] = email_lines[email] = line
+        report.students[name] = email
+    return report